@@ -0,0 +1,639 @@
+# -*- coding: utf-8 -*-
+"""This module contains a compact bitboard representation of the game state that is used for searching"""
+from __future__ import annotations
+
+import random
+from typing import Generator, List, Tuple, Union
+
+from abalone.enums import Direction, Marble, Player, Space
+from abalone.game import Game
+from abalone.utils import neighbor
+
+# every space of the board gets a cell index, in the same order as `abalone.enums.Space`
+SPACES = [space for space in Space if space is not Space.OFF]
+CELLS = {space: cell for cell, space in enumerate(SPACES)}
+DIRECTIONS = list(Direction)
+BITS = [1 << cell for cell in range(len(SPACES))]
+
+ROWS = 'IHGFEDCBA'
+OFF = -1
+
+
+def _board_indices(space: Space) -> Tuple[int, int]:
+    '''
+    Row and column of a space in `abalone.game.Game.board`
+    '''
+    row = ROWS.index(space.value[0])
+    column = int(space.value[1]) - 1 - max(0, 4 - row)
+    return row, column
+
+
+def _axial(cell: int) -> Tuple[int, int]:
+    row, column = BOARD_INDICES[cell]
+    return column + max(0, 4 - row), row
+
+
+def _distance(cell_a: int, cell_b: int) -> int:
+    q_a, r_a = _axial(cell_a)
+    q_b, r_b = _axial(cell_b)
+    return max(abs(q_a - q_b), abs(r_a - r_b), abs(q_a + r_a - q_b - r_b))
+
+
+BOARD_INDICES = [_board_indices(space) for space in SPACES]
+NEIGHBORS = [[CELLS.get(neighbor(space, direction), OFF)
+              for direction in DIRECTIONS] for space in SPACES]
+NEIGHBOR_MASKS = [sum(BITS[n] for n in NEIGHBORS[cell] if n != OFF)
+                  for cell in range(len(SPACES))]
+CENTER = CELLS[Space.E5]
+CENTER_DISTANCES = [_distance(cell, CENTER) for cell in range(len(SPACES))]
+# more than any change of the distances to the center that a single move causes
+CAPTURE_SCORE = 100
+
+# order in which `abalone.game.Game.generate_own_marble_lines` looks for lines of two or three marbles
+LINE_DIRECTIONS = [DIRECTIONS.index(direction) for direction in (
+    Direction.NORTH_WEST, Direction.NORTH_EAST, Direction.EAST)]
+OPPOSITE = [DIRECTIONS.index(direction) for direction in (
+    Direction.SOUTH_WEST, Direction.WEST, Direction.NORTH_WEST, Direction.NORTH_EAST, Direction.EAST, Direction.SOUTH_EAST)]
+
+
+def _groups() -> dict:
+    '''
+    Cells and line direction of every line of two or three spaces, keyed by its two boundary spaces
+    '''
+    groups = {}
+    for cell in range(len(SPACES)):
+        for d in LINE_DIRECTIONS:
+            cells = [cell]
+            for _ in range(2):
+                following = NEIGHBORS[cells[-1]][d]
+                if following == OFF:
+                    break
+                cells.append(following)
+                groups[(SPACES[cell], SPACES[following])] = (list(cells), d)
+                groups[(SPACES[following], SPACES[cell])] = (
+                    list(reversed(cells)), OPPOSITE[d])
+    return groups
+
+
+GROUPS = _groups()
+
+
+def _rays() -> List[List[List[int]]]:
+    '''
+    Bits of the cells between every cell and the edge of the board in every direction, starting
+    with the neighbour
+    '''
+    rays = []
+    for cell in range(len(SPACES)):
+        rays.append([])
+        for d in range(len(DIRECTIONS)):
+            ray = []
+            following = NEIGHBORS[cell][d]
+            while following != OFF:
+                ray.append(BITS[following])
+                following = NEIGHBORS[following][d]
+            rays[-1].append(ray)
+    return rays
+
+
+RAYS = _rays()
+
+# inline moves of every cell as (direction, ray), leaving out the directions that lead off the board
+INLINE_MOVES = [[(direction, RAYS[cell][d]) for d, direction in enumerate(DIRECTIONS) if RAYS[cell][d]]
+                for cell in range(len(SPACES))]
+# inline moves that can push as (direction, ray, reach), where `reach` are the three cells next to the
+# marble in the direction, one of which has to hold an opponent marble for a push
+PUSH_MOVES = [[(direction, ray, sum(ray[:3])) for direction, ray in INLINE_MOVES[cell] if len(ray) > 1]
+              for cell in range(len(SPACES))]
+
+
+def _line_table() -> List[List[Tuple[int, tuple, int, Union[tuple, None]]]]:
+    '''
+    The lines of two and three marbles that start at every cell, in the order of
+    `abalone.game.Game.generate_own_marble_lines`. Each line direction has an entry
+    `(bit1, pair, bit2, triple)`, where `bit1` and `bit2` are the bits of the second and third cell
+    (0 if off the board). A line is `(marbles, mask, broadsides)` with `broadsides` listing
+    `(direction, destinations)` for the directions in which all marbles stay on the board.
+    '''
+    def line(cells: List[int], line_direction: int) -> tuple:
+        broadsides = []
+        for d, direction in enumerate(DIRECTIONS):
+            if d == line_direction or d == OPPOSITE[line_direction]:
+                continue
+            destinations = [NEIGHBORS[cell][d] for cell in cells]
+            if OFF not in destinations:
+                broadsides.append(
+                    (direction, sum(BITS[destination] for destination in destinations)))
+        return (SPACES[cells[0]], SPACES[cells[-1]]), sum(BITS[cell] for cell in cells), broadsides
+
+    table = []
+    for cell in range(len(SPACES)):
+        table.append([])
+        for d in LINE_DIRECTIONS:
+            neighbor1 = NEIGHBORS[cell][d]
+            if neighbor1 == OFF:
+                continue
+            neighbor2 = NEIGHBORS[neighbor1][d]
+            table[-1].append((
+                BITS[neighbor1],
+                line([cell, neighbor1], d),
+                BITS[neighbor2] if neighbor2 != OFF else 0,
+                line([cell, neighbor1, neighbor2], d) if neighbor2 != OFF else None))
+    return table
+
+
+LINES = _line_table()
+
+
+def _move_codes() -> Tuple[List[Union[Tuple[Union[Space, Tuple[Space, Space]], Direction], None]], dict]:
+    '''
+    Every move gets an integer code `(cell * 7 + line) * 6 + direction`, where `line` is 0 for a single
+    marble and 1 to 6 for the lines of two and three marbles in the order of `LINE_DIRECTIONS`.
+    Sorting codes yields the order of `abalone.game.Game.generate_legal_moves`.
+    '''
+    moves = []
+    for cell, space in enumerate(SPACES):
+        lines = [space]
+        for d in LINE_DIRECTIONS:
+            neighbor1 = NEIGHBORS[cell][d]
+            neighbor2 = NEIGHBORS[neighbor1][d] if neighbor1 != OFF else OFF
+            lines.append((space, SPACES[neighbor1])
+                         if neighbor1 != OFF else None)
+            lines.append((space, SPACES[neighbor2])
+                         if neighbor2 != OFF else None)
+        for marbles in lines:
+            for direction in DIRECTIONS:
+                moves.append((marbles, direction)
+                             if marbles is not None else None)
+    return moves, {move: code for code, move in enumerate(moves) if move is not None}
+
+
+MOVES, MOVE_CODES = _move_codes()
+
+
+def _zobrist_keys() -> Tuple[List[List[int]], int, int]:
+    '''
+    Zobrist keys for every marble on every cell, for white being in turn and for white being the player
+    from whose perspective a position is evaluated. The generator is seeded, so every process that
+    imports this module uses the same keys.
+    '''
+    generator = random.Random(0xABA10E)
+    keys = [[generator.getrandbits(64) for cell in range(len(SPACES))]
+            for p in range(0, 2)]
+    return keys, generator.getrandbits(64), generator.getrandbits(64)
+
+
+ZOBRIST, ZOBRIST_TURN, ZOBRIST_PERSPECTIVE = _zobrist_keys()
+
+
+def popcount(bits: int) -> int:
+    return bin(bits).count('1')
+
+
+if hasattr(int, 'bit_count'):
+    # Python 3.10 and later
+    popcount = int.bit_count  # noqa: F811
+
+
+def iterate_cells(bits: int) -> Generator[int, None, None]:
+    '''
+    Yields the cell indices of all set bits in ascending order
+    '''
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def zobrist(bits: int, keys: List[int]) -> int:
+    '''
+    XOR of the Zobrist keys of all set bits
+    '''
+    key = 0
+    while bits:
+        lowest = bits & -bits
+        key ^= keys[lowest.bit_length() - 1]
+        bits ^= lowest
+    return key
+
+
+def totals(bits: int) -> Tuple[int, int]:
+    '''
+    Sum over the marbles in `bits` of their neighbours in `bits` and of their distances to the center
+    '''
+    adjacency = 0
+    center_distance = 0
+    for cell in iterate_cells(bits):
+        adjacency += popcount(NEIGHBOR_MASKS[cell] & bits)
+        center_distance += CENTER_DISTANCES[cell]
+    return adjacency, center_distance
+
+
+def update_totals(adjacency: int, center_distance: int, before: int, after: int) -> Tuple[int, int]:
+    '''
+    Turns the `totals` of the marbles `before` into those of the marbles `after` by only looking at the
+    marbles that were removed or added. Every pair of neighbours counts twice in the adjacency.
+    '''
+    removed = before & ~after
+    added = after & ~before
+    while removed:
+        lowest = removed & -removed
+        removed ^= lowest
+        before ^= lowest
+        cell = lowest.bit_length() - 1
+        adjacency -= 2 * popcount(NEIGHBOR_MASKS[cell] & before)
+        center_distance -= CENTER_DISTANCES[cell]
+    while added:
+        lowest = added & -added
+        added ^= lowest
+        cell = lowest.bit_length() - 1
+        adjacency += 2 * popcount(NEIGHBOR_MASKS[cell] & before)
+        before ^= lowest
+        center_distance += CENTER_DISTANCES[cell]
+    return adjacency, center_distance
+
+
+def center_delta(before: int, after: int) -> int:
+    '''
+    Change of the summed distance to the center from the marbles `before` to the marbles `after`
+    '''
+    delta = 0
+    changed = before ^ after
+    while changed:
+        lowest = changed & -changed
+        changed ^= lowest
+        if after & lowest:
+            delta += CENTER_DISTANCES[lowest.bit_length() - 1]
+        else:
+            delta -= CENTER_DISTANCES[lowest.bit_length() - 1]
+    return delta
+
+
+def distance(space_a: Space, space_b: Space) -> int:
+    '''
+    Hex distance between two spaces of the board
+    '''
+    return _distance(CELLS[space_a], CELLS[space_b])
+
+
+class Board:
+    '''
+    Compact game state for the search algorithms. The marbles of each player are stored as a
+    61 bit integer, where bit n is set if the player has a marble on the n-th `abalone.enums.Space`.
+    The class mirrors the parts of `abalone.game.Game` that the players use, but copying a board
+    only copies two integers.
+
+    The Zobrist key of the position is kept up to date by XOR-ing only the keys of the marbles that
+    a move changes. The same holds for the evaluation terms `adjacency` and `distance`, the `totals`
+    of the black and the white marbles, which are updated from the marbles that were moved or
+    pushed. With `Board.debug` set, every update is checked against a full recomputation.
+    '''
+    __slots__ = ('black', 'white', 'turn', 'key', 'adjacency', 'distance')
+
+    debug = False
+
+    def __init__(self, black: int = 0, white: int = 0, turn: Player = Player.BLACK, key: int = None, adjacency: Tuple[int, int] = None, distance: Tuple[int, int] = None):
+        self.black = black
+        self.white = white
+        self.turn = turn
+        self.key = self.compute_key() if key is None else key
+        if adjacency is None or distance is None:
+            adjacency, distance = self.compute_totals()
+        self.adjacency = adjacency
+        self.distance = distance
+
+    @classmethod
+    def from_game(cls, game: Game) -> Board:
+        black = 0
+        white = 0
+        for cell, (row, column) in enumerate(BOARD_INDICES):
+            marble = game.board[row][column]
+            if marble is Marble.BLACK:
+                black |= BITS[cell]
+            elif marble is Marble.WHITE:
+                white |= BITS[cell]
+        return cls(black, white, game.turn)
+
+    def to_game(self) -> Game:
+        game = Game()
+        for cell, (row, column) in enumerate(BOARD_INDICES):
+            game.board[row][column] = self.get_marble(SPACES[cell])
+        game.turn = self.turn
+        game.marbles = game.init_marbles()
+        return game
+
+    def copy(self) -> Board:
+        return Board(self.black, self.white, self.turn, self.key, self.adjacency, self.distance)
+
+    def pack(self) -> Tuple[int, int, int]:
+        '''
+        Compact form of the position for sending it to other processes, see `unpack`
+        '''
+        return self.black, self.white, self.turn.value
+
+    @classmethod
+    def unpack(cls, position: Tuple[int, int, int]) -> Board:
+        black, white, turn = position
+        return cls(black, white, Player(turn))
+
+    def compute_key(self) -> int:
+        '''
+        Zobrist key computed from scratch
+        '''
+        key = zobrist(self.black, ZOBRIST[0]) ^ zobrist(self.white, ZOBRIST[1])
+        return key ^ ZOBRIST_TURN if self.turn is Player.WHITE else key
+
+    def compute_totals(self) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        '''
+        Adjacency and distance of black and white computed from scratch
+        '''
+        black_adjacency, black_distance = totals(self.black)
+        white_adjacency, white_distance = totals(self.white)
+        return (black_adjacency, white_adjacency), (black_distance, white_distance)
+
+    def verify(self):
+        '''
+        Raises an `AssertionError` if the incrementally updated state differs from a full recomputation
+        '''
+        if self.key != self.compute_key():
+            raise AssertionError(
+                f'Zobrist key {self.key:#x} differs from {self.compute_key():#x} for {self}')
+        if (self.adjacency, self.distance) != self.compute_totals():
+            raise AssertionError(
+                f'Totals {(self.adjacency, self.distance)} differ from {self.compute_totals()} for {self}')
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Board) and self.black == other.black and self.white == other.white and self.turn is other.turn
+
+    def __repr__(self) -> str:
+        return f'Board(black={self.black:#x}, white={self.white:#x}, turn={self.turn.name})'
+
+    def not_in_turn_player(self) -> Player:
+        return Player.BLACK if self.turn is Player.WHITE else Player.WHITE
+
+    def switch_player(self):
+        self.turn = self.not_in_turn_player()
+        self.key ^= ZOBRIST_TURN
+        if self.debug:
+            self.verify()
+
+    def get_score(self) -> Tuple[int, int]:
+        return popcount(self.black), popcount(self.white)
+
+    def get_marble(self, space: Space) -> Marble:
+        bit = BITS[CELLS[space]]
+        if self.black & bit:
+            return Marble.BLACK
+        if self.white & bit:
+            return Marble.WHITE
+        return Marble.BLANK
+
+    def _own_and_opponent(self) -> Tuple[int, int]:
+        if self.turn is Player.BLACK:
+            return self.black, self.white
+        return self.white, self.black
+
+    def _own_and_opponent_keys(self) -> Tuple[List[int], List[int]]:
+        if self.turn is Player.BLACK:
+            return ZOBRIST[0], ZOBRIST[1]
+        return ZOBRIST[1], ZOBRIST[0]
+
+    def _totals_after(self, black: int, white: int) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        '''
+        Adjacency and distance of the position with the marbles `black` and `white`, updated from
+        the totals of this board
+        '''
+        adjacency, distance = self.adjacency, self.distance
+        if black != self.black:
+            black_adjacency, black_distance = update_totals(
+                adjacency[0], distance[0], self.black, black)
+            adjacency, distance = (black_adjacency, adjacency[1]), (
+                black_distance, distance[1])
+        if white != self.white:
+            white_adjacency, white_distance = update_totals(
+                adjacency[1], distance[1], self.white, white)
+            adjacency, distance = (adjacency[0], white_adjacency), (
+                distance[0], white_distance)
+        return adjacency, distance
+
+    def _set_own_and_opponent(self, own: int, opponent: int):
+        own_keys, opponent_keys = self._own_and_opponent_keys()
+        if self.turn is Player.BLACK:
+            changed_own, changed_opponent = self.black ^ own, self.white ^ opponent
+            black, white = own, opponent
+        else:
+            changed_own, changed_opponent = self.white ^ own, self.black ^ opponent
+            black, white = opponent, own
+        self.adjacency, self.distance = self._totals_after(black, white)
+        self.black, self.white = black, white
+        self.key ^= zobrist(changed_own, own_keys) ^ zobrist(
+            changed_opponent, opponent_keys)
+        if self.debug:
+            self.verify()
+
+    def inline_marbles_nums(self, caboose: Space, direction: Direction) -> Tuple[int, int]:
+        '''
+        Same as `abalone.game.Game._inline_marbles_nums` for the line from `caboose` to the edge
+        '''
+        own, opponent = self._own_and_opponent()
+        d = DIRECTIONS.index(direction)
+        cell = CELLS[caboose]
+        own_marbles_num = 0
+        while cell != OFF and own & BITS[cell]:
+            own_marbles_num += 1
+            cell = NEIGHBORS[cell][d]
+        opp_marbles_num = 0
+        while cell != OFF and opponent & BITS[cell]:
+            opp_marbles_num += 1
+            cell = NEIGHBORS[cell][d]
+        return own_marbles_num, opp_marbles_num
+
+    @staticmethod
+    def _inline(own: int, opponent: int, bit: int, ray: List[int]) -> Union[Tuple[int, int], None]:
+        '''
+        Bitboards after an inline move of the marble `bit` along `ray`, its entry in `RAYS`, or `None` if
+        the move is illegal
+        '''
+        length = len(ray)
+        i = 0
+        while i < length and own & ray[i]:
+            i += 1
+        if i == length or i > 2:
+            # own marbles must not be moved off the board and at most three marbles move
+            return None
+        front = ray[i]
+        if not opponent & front:
+            return own ^ bit ^ front, opponent
+        j = i + 1
+        while j < length and opponent & ray[j]:
+            j += 1
+        if j - i > i:
+            # the opponent needs fewer marbles in line than we move
+            return None
+        if j == length:
+            # marble is pushed off the board
+            return own ^ bit ^ front, opponent ^ front
+        if own & ray[j]:
+            return None
+        return own ^ bit ^ front, opponent ^ front ^ ray[j]
+
+    def _broadside(self, own: int, opponent: int, cells: List[int], d: int) -> Union[Tuple[int, int], None]:
+        '''
+        Bitboards after a broadside move of `cells` or `None` if the move is illegal
+        '''
+        occupied = own | opponent
+        for cell in cells:
+            destination = NEIGHBORS[cell][d]
+            if destination == OFF or occupied & BITS[destination]:
+                return None
+            own ^= BITS[cell] | BITS[destination]
+        return own, opponent
+
+    def _successors(self) -> Generator[Tuple[Tuple[Union[Space, Tuple[Space, Space]], Direction], int, int], None, None]:
+        '''
+        Yields every legal move with the bitboards of the player in turn and the opponent after it.
+        All lines, rays and broadside destinations are looked up in `INLINE_MOVES` and `LINES`.
+        '''
+        own, opponent = self._own_and_opponent()
+        occupied = own | opponent
+        remaining = own
+        while remaining:
+            bit = remaining & -remaining
+            remaining ^= bit
+            cell = bit.bit_length() - 1
+            space = SPACES[cell]
+            for direction, ray in INLINE_MOVES[cell]:
+                result = self._inline(own, opponent, bit, ray)
+                if result is not None:
+                    yield (space, direction), result[0], result[1]
+            for bit1, pair, bit2, triple in LINES[cell]:
+                if not own & bit1:
+                    continue
+                marbles, mask, broadsides = pair
+                for direction, destinations in broadsides:
+                    if not occupied & destinations:
+                        yield (marbles, direction), own ^ mask ^ destinations, opponent
+                if own & bit2:
+                    marbles, mask, broadsides = triple
+                    for direction, destinations in broadsides:
+                        if not occupied & destinations:
+                            yield (marbles, direction), own ^ mask ^ destinations, opponent
+
+    def generate_legal_moves(self) -> Generator[Tuple[Union[Space, Tuple[Space, Space]], Direction], None, None]:
+        '''
+        Yields the same moves in the same order as `abalone.game.Game.generate_legal_moves`
+        '''
+        for move, _, _ in self._successors():
+            yield move
+
+    def generate_successors(self) -> Generator[Tuple[Tuple[Union[Space, Tuple[Space, Space]], Direction], int, int], None, None]:
+        '''
+        Yields every legal move with the bitboards of the player in turn and the opponent after it, in
+        the order of `generate_legal_moves`. `child` builds the resulting board from the bitboards.
+        '''
+        return self._successors()
+
+    def generate_pushes(self) -> Generator[Tuple[Tuple[Union[Space, Tuple[Space, Space]], Direction], int, int], None, None]:
+        '''
+        Same as `generate_successors`, but only the inline moves that push opponent marbles (sumitos),
+        including the ones that push a marble off the board. These are the moves for which
+        `inline_marbles_nums` counts opponent marbles in front of the line, only rays with an opponent
+        marble within reach are looked at.
+        '''
+        own, opponent = self._own_and_opponent()
+        remaining = own
+        while remaining:
+            bit = remaining & -remaining
+            remaining ^= bit
+            cell = bit.bit_length() - 1
+            for direction, ray, reach in PUSH_MOVES[cell]:
+                if opponent & reach:
+                    result = self._inline(own, opponent, bit, ray)
+                    if result is not None and result[1] != opponent:
+                        yield (SPACES[cell], direction), result[0], result[1]
+
+    def child(self, own: int, opponent: int) -> Board:
+        '''
+        Board after the move to the bitboards `own` and `opponent` of `generate_successors`, where the
+        opponent is in turn
+        '''
+        current_own, current_opponent = self._own_and_opponent()
+        own_keys, opponent_keys = self._own_and_opponent_keys()
+        key = self.key ^ ZOBRIST_TURN ^ zobrist(current_own ^ own, own_keys) ^ zobrist(
+            current_opponent ^ opponent, opponent_keys)
+        black, white = (own, opponent) if self.turn is Player.BLACK else (
+            opponent, own)
+        child = Board(black, white, self.not_in_turn_player(), key,
+                      *self._totals_after(black, white))
+        if self.debug:
+            child.verify()
+        return child
+
+    def successor_score(self, own: int, opponent: int) -> Tuple[int, int]:
+        '''
+        `get_score` of the position after the move to the bitboards `own` and `opponent` of
+        `generate_successors`
+        '''
+        if self.turn is Player.BLACK:
+            return popcount(own), popcount(opponent)
+        return popcount(opponent), popcount(own)
+
+    def move_score(self, own: int, opponent: int) -> int:
+        '''
+        Cheap score of the move to the bitboards `own` and `opponent` of `generate_successors` for move
+        ordering, which does not build the position: every marble pushed off the board counts
+        `CAPTURE_SCORE`, then how much closer to the center the own marbles and how much farther from
+        it the opponent marbles get.
+        '''
+        current_own, current_opponent = self._own_and_opponent()
+        if opponent == current_opponent:
+            return -center_delta(current_own, own)
+        captured = popcount(current_opponent) - popcount(opponent)
+        return CAPTURE_SCORE * captured + center_delta(current_opponent, opponent) - center_delta(current_own, own)
+
+    def generate_children(self) -> Generator[Tuple[Tuple[Union[Space, Tuple[Space, Space]], Direction], Board], None, None]:
+        '''
+        Yields every legal move together with the resulting board, where the opponent is in turn
+        '''
+        for move, own, opponent in self._successors():
+            yield move, self.child(own, opponent)
+
+    def generate_random_move(self) -> Tuple[Union[Space, Tuple[Space, Space]], Direction]:
+        return random.choice(list(self.generate_legal_moves()))
+
+    def make(self, marbles: Union[Space, Tuple[Space, Space]], direction: Direction) -> Tuple[int, int, Player, int, Tuple[int, int], Tuple[int, int]]:
+        '''
+        Performs a move and switches the player in turn
+
+        Returns:
+            The undo record that `unmake` needs to restore the board exactly. Since the state is just the
+            two bitboards and the player in turn, this includes pushed off marbles and the score.
+        '''
+        undo = (self.black, self.white, self.turn,
+                self.key, self.adjacency, self.distance)
+        self.move(marbles, direction)
+        self.switch_player()
+        return undo
+
+    def unmake(self, undo: Tuple[int, int, Player, int, Tuple[int, int], Tuple[int, int]]):
+        '''
+        Takes back the move that returned `undo`
+        '''
+        self.black, self.white, self.turn, self.key, self.adjacency, self.distance = undo
+        if self.debug:
+            self.verify()
+
+    def move(self, marbles: Union[Space, Tuple[Space, Space]], direction: Direction):
+        '''
+        Performs a move that was generated by `generate_legal_moves`. In contrast to
+        `abalone.game.Game.move`, legality is not checked.
+        '''
+        own, opponent = self._own_and_opponent()
+        d = DIRECTIONS.index(direction)
+        if isinstance(marbles, Space):
+            cell = CELLS[marbles]
+            result = self._inline(own, opponent, BITS[cell], RAYS[cell][d])
+        else:
+            cells, _ = GROUPS[marbles]
+            result = self._broadside(own, opponent, cells, d)
+        self._set_own_and_opponent(*result)
@@ -0,0 +1,83 @@
+import time
+from dataclasses import dataclass
+from typing import List
+
+from abalone.enums import InitialPosition
+from abalone.game import Game
+
+from .. import players, utils
+
+WORKERS = [1, 2, 4, 8]
+POSITIONS = [
+    InitialPosition.DEFAULT,
+    InitialPosition.GERMAN_DAISY,
+]
+# time per move for the depth reached, the time to depth is measured at the depth of the player
+MAX_TIME = 10
+
+
+@dataclass
+class Scaling:
+    position: str
+    workers: int
+    depth: int
+    time_to_depth: float
+    speedup: float
+    nodes: int
+    depth_reached: int
+
+    def __str__(self):
+        return f'{self.position} workers {self.workers}: depth {self.depth} in {self.time_to_depth:.2f}s (speedup {self.speedup:.2f}, {self.nodes} nodes), depth {self.depth_reached} in {MAX_TIME}s'
+
+
+@dataclass
+class LazySMPScaling(utils.Stats):
+    _dir = 'lazy_smp'
+
+    results: List[Scaling]
+
+
+def main():
+    results = []
+    for position in POSITIONS:
+        baseline = None
+        for workers in WORKERS:
+            game = Game(initial_position=position)
+            print(f'[ ] Running {position.name} with {workers} workers...')
+            player = players.LazySMPPlayer(workers=workers, verbose=False)
+            try:
+                players.nodes = 0
+                start = time.time()
+                _, depth = player.search(game)
+                time_to_depth = time.time() - start
+                nodes = players.nodes
+            finally:
+                player.close()
+
+            player = players.LazySMPPlayer(
+                workers=workers, max_time=MAX_TIME, verbose=False)
+            try:
+                _, depth_reached = player.search(game)
+            finally:
+                player.close()
+            if baseline is None:
+                baseline = time_to_depth
+            result = Scaling(
+                position=position.name,
+                workers=workers,
+                depth=depth,
+                time_to_depth=time_to_depth,
+                speedup=baseline / time_to_depth,
+                nodes=nodes,
+                depth_reached=depth_reached,
+            )
+            results.append(result)
+            print(f'[x] {result}')
+
+    print('[ ] Saving...')
+    LazySMPScaling(results=results).save()
+    print('[x] Saved')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from typing import List
+
+from abalone.enums import InitialPosition
+from abalone.game import Game
+
+from .. import players, utils
+
+WORKERS = [1, 2, 4, 8]
+POSITIONS = [
+    InitialPosition.DEFAULT,
+    InitialPosition.GERMAN_DAISY,
+]
+MAX_TIME = 10
+
+
+@dataclass
+class Throughput:
+    position: str
+    parallelization: str
+    workers: int
+    simulations_per_second: float
+    speedup: float
+    same_move: bool
+
+    def __str__(self):
+        return f'{self.position} {self.parallelization} workers {self.workers}: {self.simulations_per_second:.0f} sims/s (speedup {self.speedup:.2f}), {"same" if self.same_move else "other"} move'
+
+
+@dataclass
+class MctsScaling(utils.Stats):
+    _dir = 'mcts_parallel'
+
+    max_time: float
+    results: List[Throughput]
+
+
+def main():
+    results = []
+    for position in POSITIONS:
+        game = Game(initial_position=position)
+        for parallelization in players.MonteCarloPlayer.PARALLELIZATIONS:
+            baseline = None
+            for workers in WORKERS:
+                print(f'[ ] Running {position.name} with {parallelization} parallelization and {workers} workers...')
+                player = players.MonteCarloPlayerImproved(
+                    max_time=MAX_TIME, workers=workers, parallelization=parallelization, verbose=False)
+                try:
+                    move = player.turn(game, [])
+                finally:
+                    player.close()
+                if baseline is None:
+                    baseline = (player.simulations_per_second, move)
+                result = Throughput(
+                    position=position.name,
+                    parallelization=parallelization,
+                    workers=workers,
+                    simulations_per_second=player.simulations_per_second,
+                    speedup=player.simulations_per_second / baseline[0],
+                    same_move=move == baseline[1],
+                )
+                results.append(result)
+                print(f'[x] {result}')
+
+    print('[ ] Saving...')
+    MctsScaling(max_time=MAX_TIME, results=results).save()
+    print('[x] Saved')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import copy
+import time
+from dataclasses import dataclass
+from typing import List
+
+from abalone.enums import InitialPosition
+from abalone.game import Game
+
+from .. import utils
+from ..board import Board
+
+
+@dataclass
+class PerftResult:
+    position: str
+    depth: int
+    nodes: int
+    time: float
+    nodes_per_second: float
+
+    def __str__(self):
+        return f'{self.position} depth {self.depth}: {self.nodes} nodes in {self.time:.2f}s ({self.nodes_per_second:.0f} nodes/s)'
+
+
+@dataclass
+class Perft(utils.Stats):
+    _dir = 'perft'
+
+    results: List[PerftResult]
+
+
+POSITIONS = [
+    InitialPosition.DEFAULT,
+    InitialPosition.GERMAN_DAISY,
+]
+MAX_DEPTH = 4
+# depth up to which every move list is compared with the one of `abalone.game.Game`
+VERIFY_DEPTH = 2
+
+
+def perft(board: Board, depth: int) -> int:
+    '''
+    Number of positions reachable in exactly `depth` moves, finished games are not expanded
+    '''
+    if utils.game_is_over(board.get_score()):
+        return 1
+    if depth == 1:
+        return sum(1 for _ in board.generate_legal_moves())
+    nodes = 0
+    for move in list(board.generate_legal_moves()):
+        undo = board.make(*move)
+        nodes += perft(board, depth - 1)
+        board.unmake(undo)
+    return nodes
+
+
+def verify(game: Game, depth: int):
+    '''
+    Raises an `AssertionError` if the moves of `Board` differ from those of the library in any
+    position up to `depth` moves away
+    '''
+    board = Board.from_game(game)
+    moves = list(game.generate_legal_moves())
+    if list(board.generate_legal_moves()) != moves:
+        raise AssertionError(f'Move lists differ for {board}')
+    if depth <= 1:
+        return
+    for move in moves:
+        child = copy.deepcopy(game)
+        child.move(*move)
+        child.switch_player()
+        verify(child, depth - 1)
+
+
+def main():
+    results = []
+    for position in POSITIONS:
+        print(f'[ ] Verifying {position.name} up to depth {VERIFY_DEPTH}...')
+        verify(Game(initial_position=position), VERIFY_DEPTH)
+        print('[x] Move lists match the library')
+        for depth in range(1, MAX_DEPTH + 1):
+            board = Board.from_game(Game(initial_position=position))
+            start = time.time()
+            nodes = perft(board, depth)
+            total_time = time.time() - start
+            result = PerftResult(
+                position=position.name,
+                depth=depth,
+                nodes=nodes,
+                time=total_time,
+                nodes_per_second=nodes / total_time if total_time > 0 else float('inf'),
+            )
+            results.append(result)
+            print(f'[x] {result}')
+
+    print('[ ] Saving...')
+    Perft(results=results).save()
+    print('[x] Saved')
+
+
+if __name__ == '__main__':
+    main()
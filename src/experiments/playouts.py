@@ -0,0 +1,110 @@
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Tuple
+
+from abalone.enums import InitialPosition
+from abalone.game import Game
+
+from .. import playouts, utils
+from ..board import Board
+
+POSITIONS = [
+    InitialPosition.DEFAULT,
+    InitialPosition.GERMAN_DAISY,
+]
+# playouts of every position with each engine, as long as `players.MonteCarloSearch` plays them
+PLAYOUTS = 1000
+MAX_PLIES = 200
+
+
+@dataclass
+class PlayoutResult:
+    position: str
+    engine: str
+    playouts: int
+    time: float
+    simulations_per_second: float
+    black_marbles: float
+    white_marbles: float
+    finished: int
+
+    def __str__(self):
+        return f'{self.position} {self.engine}: {self.simulations_per_second:.0f} sims/s, {self.black_marbles:.2f}/{self.white_marbles:.2f} marbles left on average, {self.finished}/{self.playouts} games finished'
+
+
+@dataclass
+class Playouts(utils.Stats):
+    _dir = 'playouts'
+
+    max_plies: int
+    results: List[PlayoutResult]
+
+
+def copy_playout(board: Board) -> Tuple[int, int]:
+    '''
+    Playout on a copy of the board with `Board.generate_random_move`, as the Monte Carlo players
+    played them before `playouts.playout`
+    '''
+    plies = 0
+    state = board.copy()
+    while plies < MAX_PLIES and not utils.game_is_over(state.get_score()):
+        state.move(*state.generate_random_move())
+        state.switch_player()
+        plies += 1
+    return state.get_score()
+
+
+def copy_playouts(board: Board) -> List[Tuple[int, int]]:
+    return [copy_playout(board) for _ in range(PLAYOUTS)]
+
+
+def bitboard_playouts(board: Board) -> List[Tuple[int, int]]:
+    return [playouts.playout(board.black, board.white, board.turn, MAX_PLIES) for _ in range(PLAYOUTS)]
+
+
+def array_playouts(board: Board) -> List[Tuple[int, int]]:
+    return playouts.batch_playout(board.black, board.white, board.turn, MAX_PLIES, PLAYOUTS).tolist()
+
+
+ENGINES = {
+    'copy': copy_playouts,
+    'bitboards': bitboard_playouts,
+    'arrays': array_playouts,
+}
+
+
+def run(position: InitialPosition, engine: str, play: Callable[[Board], List[Tuple[int, int]]]) -> PlayoutResult:
+    board = Board.from_game(Game(initial_position=position))
+    random.seed(0)
+    start = time.time()
+    scores = play(board)
+    total_time = time.time() - start
+    return PlayoutResult(
+        position=position.name,
+        engine=engine,
+        playouts=PLAYOUTS,
+        time=total_time,
+        simulations_per_second=PLAYOUTS / total_time,
+        black_marbles=sum(score[0] for score in scores) / PLAYOUTS,
+        white_marbles=sum(score[1] for score in scores) / PLAYOUTS,
+        finished=sum(utils.game_is_over(score) for score in scores),
+    )
+
+
+def main():
+    results = []
+    for position in POSITIONS:
+        for engine, play in ENGINES.items():
+            print(f'[ ] Playing out {position.name} with {engine}...')
+            result = run(position, engine, play)
+            results.append(result)
+            print(f'[x] {result}')
+
+    print('[ ] Saving...')
+    Playouts(max_plies=MAX_PLIES, results=results).save()
+    print('[x] Saved')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import time
+from dataclasses import dataclass
+from typing import List
+
+from abalone.enums import InitialPosition
+from abalone.game import Game
+
+from .. import players, utils
+from ..workers import WorkerPool
+
+POSITIONS = [
+    InitialPosition.DEFAULT,
+    InitialPosition.GERMAN_DAISY,
+]
+DEPTH = 4
+
+
+@dataclass
+class Comparison:
+    position: str
+    algorithm: str
+    workers: int
+    value: float
+    nodes: int
+    time: float
+    node_ratio: float
+    speedup: float
+
+    def __str__(self):
+        return f'{self.position} {self.algorithm} ({self.workers} workers): value {self.value}, {self.nodes} nodes ({self.node_ratio:.2f}), {self.time:.2f}s (speedup {self.speedup:.2f})'
+
+
+@dataclass
+class PVSComparison(utils.Stats):
+    _dir = 'pvs'
+
+    depth: int
+    results: List[Comparison]
+
+
+def main():
+    results = []
+    pool = WorkerPool()
+    try:
+        for position in POSITIONS:
+            game = Game(initial_position=position)
+            runs = [
+                (players.AlphaBetaSimple, None),
+                (players.PVS, None),
+                (players.PVS, pool),
+            ]
+            baseline = None
+            for algorithm, worker_pool in runs:
+                players.storage = utils.Storage()
+                players.nodes = 0
+                kwargs = {'pool': worker_pool} if algorithm is players.PVS else {}
+                print(f'[ ] Running {algorithm.__name__} on {position.name}...')
+                start = time.time()
+                value = algorithm(game, game.turn.value, depth=DEPTH, initial_depth=DEPTH,
+                                  func=players.count_nodes, **kwargs).run()
+                total_time = time.time() - start
+                if baseline is None:
+                    baseline = (players.nodes, total_time)
+                result = Comparison(
+                    position=position.name,
+                    algorithm=algorithm.__name__,
+                    workers=worker_pool.processes if worker_pool is not None else 1,
+                    value=value[0],
+                    nodes=players.nodes,
+                    time=total_time,
+                    node_ratio=players.nodes / baseline[0],
+                    speedup=baseline[1] / total_time,
+                )
+                results.append(result)
+                print(f'[x] {result}')
+    finally:
+        pool.close()
+
+    print('[ ] Saving...')
+    PVSComparison(depth=DEPTH, results=results).save()
+    print('[x] Saved')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import time
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from abalone.enums import InitialPosition, Player
+from abalone.game import Game
+
+from .. import players, utils
+from ..board import Board
+
+POSITIONS = [
+    InitialPosition.DEFAULT,
+    InitialPosition.GERMAN_DAISY,
+]
+# searches of every position to this depth, with iterative deepening like a player
+DEPTH = 4
+VARIANTS = {
+    'none': {},
+    'late move reductions': {'late_move_reductions': True},
+    'null move': {'null_move_pruning': True},
+    'futility': {'futility_pruning': True},
+    'all': {'late_move_reductions': True, 'null_move_pruning': True, 'futility_pruning': True},
+}
+# games against `players.AlphaBetaPlayer`, one with each color, and the moves after which the player
+# with more marbles left wins
+GAMES = 2
+MAX_MOVES = 200
+
+
+@dataclass
+class Reduction:
+    variant: str
+    nodes: int
+    time: float
+    node_ratio: float
+    same_moves: int
+    wins: int
+    draws: int
+    losses: int
+    time_per_move: float
+
+    def __str__(self):
+        return f'{self.variant}: {self.nodes} nodes ({self.node_ratio:.2f}), {self.time:.2f}s, {self.same_moves} same moves, {self.wins}/{self.draws}/{self.losses} against AlphaBetaPlayer ({self.time_per_move:.2f}s per move)'
+
+
+@dataclass
+class Reductions(utils.Stats):
+    _dir = 'reductions'
+
+    depth: int
+    results: List[Reduction]
+
+
+def search(algorithm: type, game: Game) -> tuple:
+    board = Board.from_game(game)
+    pv = None
+    for depth in range(1, DEPTH + 1):
+        node = algorithm(board, game.turn.value, depth=depth, initial_depth=depth,
+                         func=players.count_nodes, pv=pv)
+        result = node.run()
+        pv = node.variation
+    return result
+
+
+def play(black: players.AlphaBetaPlayer, white: players.AlphaBetaPlayer) -> Tuple[Player, List[float]]:
+    '''
+    Plays a game
+
+    Returns:
+        The winner or `None` for a draw and the times of all moves of black and white
+    '''
+    game = Game()
+    moves_history = []
+    times = {Player.BLACK: [], Player.WHITE: []}
+    while len(moves_history) < MAX_MOVES and utils.get_winner(game.get_score()) is None:
+        player = black if game.turn is Player.BLACK else white
+        start = time.time()
+        move = player.turn(game, moves_history)
+        times[game.turn].append(time.time() - start)
+        game.move(*move)
+        game.switch_player()
+        moves_history.append(move)
+    score = game.get_score()
+    if score[0] == score[1]:
+        return None, times
+    return (Player.BLACK if score[0] > score[1] else Player.WHITE), times
+
+
+def main():
+    results = []
+    baseline = None
+    for name, switches in VARIANTS.items():
+        algorithm = type(f'AlphaBetaAdvanced ({name})',
+                         (players.AlphaBetaAdvanced,), switches)
+        player_class = type(f'AlphaBetaPlayer ({name})', (players.AlphaBetaPlayer,), {
+            'get_algorithm': lambda self, algorithm=algorithm: algorithm})
+
+        print(f'[ ] Searching with {name}...')
+        nodes = 0
+        moves = []
+        start = time.time()
+        for position in POSITIONS:
+            players.storage = utils.Storage()
+            players.history = utils.MoveHistory()
+            players.nodes = 0
+            result = search(algorithm, Game(initial_position=position))
+            nodes += players.nodes
+            moves.append(result[1:])
+        total_time = time.time() - start
+        if baseline is None:
+            baseline = (nodes, moves)
+
+        print(f'[ ] Playing with {name}...')
+        outcomes = []
+        move_times = []
+        for i in range(GAMES):
+            player = player_class(verbose=False)
+            opponent = players.AlphaBetaPlayer(verbose=False)
+            color = Player.BLACK if i % 2 == 0 else Player.WHITE
+            winner, times = play(player, opponent) if color is Player.BLACK else play(
+                opponent, player)
+            outcomes.append(0 if winner is None else (
+                1 if winner is color else -1))
+            move_times.extend(times[color])
+
+        result = Reduction(
+            variant=name,
+            nodes=nodes,
+            time=total_time,
+            node_ratio=nodes / baseline[0],
+            same_moves=sum(move == expected for move,
+                           expected in zip(moves, baseline[1])),
+            wins=outcomes.count(1),
+            draws=outcomes.count(0),
+            losses=outcomes.count(-1),
+            time_per_move=sum(move_times) / len(move_times),
+        )
+        results.append(result)
+        print(f'[x] {result}')
+
+    print('[ ] Saving...')
+    Reductions(depth=DEPTH, results=results).save()
+    print('[x] Saved')
+
+
+if __name__ == '__main__':
+    main()
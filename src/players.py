@@ -2,37 +2,94 @@
 """This module is a collection of various AI agents"""
 from __future__ import annotations
 
-import copy
 import hashlib
 import inspect
 import math
+import os
 import random
 import sys
 import time
-from collections import defaultdict
+from collections import deque
 from dataclasses import dataclass
-from itertools import product
+from itertools import islice
 from math import floor
-from multiprocessing import Pool
+from multiprocessing import RawValue, cpu_count
 from operator import itemgetter
 from random import choice
-from typing import List, Tuple, Union
+from typing import Generator, Iterable, List, Tuple, Union
 
+import numpy as np
 from abalone.abstract_player import AbstractPlayer
 from abalone.enums import Direction, Marble, Player, Space
 from abalone.game import Game
-from abalone.hex import Cube
-from abalone.utils import line_to_edge, space_to_board_indices
 
-from . import utils
+from . import playouts, utils
+from .board import MOVE_CODES, MOVES, ZOBRIST_PERSPECTIVE, Board, distance
+from .workers import WorkerPool
 
 nodes = 0
-storage = utils.Storage()
+# the table of the searches of this process when no player shares one with its worker processes
+default_storage = utils.Storage()
+storage = default_storage
+history = utils.MoveHistory()
+# set by `LazySMPPlayer` to stop the searches of its helper processes
+stop_flag = None
 
 
-def run(child, parent):
-    return AlphaBetaSimple(
-        child[0], parent.player, parent.depth - 1, parent.alpha, parent.beta, not parent.is_maximizer, child[1], child[2], func=parent.func).run()
+def use_storage(shared: utils.Storage):
+    '''
+    Makes all searches of this process use `shared` as transposition table
+    '''
+    global storage
+    storage = shared
+
+
+def release_storage(shared: utils.Storage):
+    '''
+    Closes `shared` and, if the searches of this process still use it, makes them use
+    `default_storage` again
+    '''
+    if storage is shared:
+        use_storage(default_storage)
+    shared.close()
+
+
+def search_moves(position: Tuple[int, int, int], algorithm: type, perspective: int, depth: int, alpha: float, beta: float, codes: List[int], initial_depth: int, deadline: float) -> Tuple[List[Tuple[int, float, list]], int]:
+    '''
+    Searches a batch of moves of the root in a worker process, like the younger brothers in `PVS`: every
+    move gets a null window search above alpha and only the moves that fail high are searched again
+    with the window up to beta. Alpha rises with the moves of the batch.
+
+    Args:
+        position: The root as returned by `Board.pack`, the player in turn is the maximizer
+        algorithm: The class of the nodes below the root
+        codes: The moves as their `MOVE_CODES`
+
+    Returns:
+        The code, value and principal variation of every move, the number of nodes visited and the
+        process id together with the statistics of its transposition table
+    '''
+    global nodes
+    nodes = 0
+    board = Board.unpack(position)
+
+    def search(marbles, direction, alpha, beta):
+        node = algorithm(board, perspective, depth, alpha, beta, False, marbles, direction,
+                         func=count_nodes, initial_depth=initial_depth, deadline=deadline, ply=1)
+        return node.run()[0], node.variation
+
+    results = []
+    for code in codes:
+        marbles, direction = MOVES[code]
+        undo = board.make(marbles, direction)
+        value, variation = search(marbles, direction,
+                                  alpha, alpha + PVS.NULL_WINDOW)
+        if alpha < value < beta:
+            value, variation = search(marbles, direction, value, beta)
+        board.unmake(undo)
+        alpha = max(alpha, value)
+        results.append((code, value, variation))
+    return results, nodes, (os.getpid(), storage.stats())
 
 
 def count_nodes():
@@ -40,11 +97,24 @@ def count_nodes():
     nodes += 1
 
 
+class SearchTimeout(Exception):
+    '''
+    Raised by a search that exceeds its deadline
+    '''
+
+
 class Heuristics:
     @classmethod
-    def evaluate_move(cls, player: Player, current: Game, result: Game, marbles: Union[Space, Tuple[Space, Space]], direction: Direction) -> float:
+    def evaluate_move(cls, player: Player, current: Board, result: Board, marbles: Union[Space, Tuple[Space, Space]], direction: Direction) -> float:
+        return cls.evaluate_score(player, current, result.get_score(), marbles, direction)
+
+    @classmethod
+    def evaluate_score(cls, player: Player, current: Board, new_score: Tuple[int, int], marbles: Union[Space, Tuple[Space, Space]], direction: Direction) -> float:
+        '''
+        Same as `evaluate_move`, where `new_score` is the score of the resulting position, which is all
+        that is needed of it
+        '''
         old_score = current.get_score()
-        new_score = result.get_score()
         not_player = Player.WHITE.value if player == Player.BLACK.value else Player.BLACK.value
         if utils.game_is_over(new_score):
             w_0 = 10000
@@ -60,13 +130,10 @@ class Heuristics:
         multiple = 0
         attacking = 0
         if isinstance(marbles, tuple):
-            c1 = Cube.from_board_array(*space_to_board_indices(marbles[0]))
-            c2 = Cube.from_board_array(*space_to_board_indices(marbles[1]))
-            multiple = c1.distance(c2)
+            multiple = distance(marbles[0], marbles[1])
         else:
-            line = line_to_edge(marbles, direction)
-            own_marbles_num, opp_marbles_num = current._inline_marbles_nums(
-                line)
+            own_marbles_num, opp_marbles_num = current.inline_marbles_nums(
+                marbles, direction)
             multiple = own_marbles_num - 1
             if opp_marbles_num > 0:
                 attacking += 1
@@ -92,8 +159,55 @@ class Algorithm:
 
 
 class AlphaBetaBase(Algorithm):
-    def __init__(self, game: Game, perspective: Player, depth: int = 4, alpha: float = float('-inf'), beta: float = float('inf'), is_maximizer: bool = True, marbles: Union[Space, Tuple[Space, Space]] = None, direction: Direction = None, func: function = None, initial_depth: int = 4):
-        self.game = game
+    '''
+    Alpha-beta search in minimax form, all values are from the perspective of `player`. The object that
+    is created for the root searches the whole tree: `_run` calls itself for every child with the
+    depth, the window and the side of the child's node, and the hooks get what they need of them as
+    arguments. Only the ply of the current node is kept in `ply`, and `_run` leaves the principal
+    variation of the node in `variation`.
+    '''
+    # whether the evaluations of `_create_children` are the heuristic values of the children, so
+    # nodes at depth 1 can take them as the values of their leaves instead of visiting them
+    leaf_evaluations = False
+    # whether killer moves are searched right after the hash move and nodes with at least
+    # `history_depth` plies left are ordered by killer moves and history scores only, without
+    # building and evaluating every child
+    history_ordering = False
+    history_depth = 3
+    # whether `_create_children` is the staged move picker `_pick_children`, which builds the position
+    # after a move only when the search reaches it, instead of evaluating and ordering all children
+    staged_ordering = False
+    # at most this many moves are searched in every node, the best ones after ordering
+    move_limit = None
+    # plies of pushes that `_quiescence` searches beyond the leaves, 0 turns it off
+    quiescence_depth = 0
+    # late move reductions: in nodes with at least `lmr_depth` plies left, every move after the first
+    # `lmr_moves` that does not push is searched `lmr_reduction` plies shallower with a null window and
+    # only searched again at full depth if it beats the window
+    late_move_reductions = False
+    lmr_depth = 3
+    lmr_moves = 4
+    lmr_reduction = 1
+    # verified null-move pruning: in nodes with at least `null_move_depth` plies left, the player in
+    # turn passes and the opponent is searched `null_move_reduction` plies shallower
+    null_move_pruning = False
+    null_move_depth = 3
+    null_move_reduction = 2
+    # futility pruning: in nodes with n plies left, moves that do not push are skipped if the heuristic
+    # plus the (n - 1)-th margin cannot reach the window. The margins are a bit more than a move that
+    # does not push changes the heuristic by in one and two plies.
+    futility_pruning = False
+    FUTILITY_MARGINS = (15, 25)
+    # smallest difference between two values of the heuristic
+    NULL_WINDOW = 0.5
+
+    def __init__(self, game: Union[Game, Board], perspective: Player, depth: int = 4, alpha: float = float('-inf'), beta: float = float('inf'), is_maximizer: bool = True, marbles: Union[Space, Tuple[Space, Space]] = None, direction: Direction = None, func: function = None, initial_depth: int = 4, pv: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]] = None, deadline: float = None, ply: int = 0):
+        '''
+        Args:
+            ply: The ply of the root below the root of the whole search, 1 for the moves that
+                `search_moves` searches in a worker process
+        '''
+        self.game = game if isinstance(game, Board) else Board.from_game(game)
         self.depth = depth
         self.alpha = alpha
         self.beta = beta
@@ -104,126 +218,469 @@ class AlphaBetaBase(Algorithm):
         self.not_player = Player.BLACK.value if perspective == Player.WHITE.value else Player.WHITE.value
         self.func = func
         self.initial_depth = initial_depth
+        # principal variation of the previous iteration and of the node searched last
+        self.pv = pv
+        self.variation = ()
+        self.deadline = deadline
+        # plies between the root of the whole search and the current node
+        self.ply = ply
         if func:
             func()
 
-    def _heuristic(self, game: Game) -> float:
+    def _heuristic(self, game: Board) -> float:
         raise NotImplementedError
 
-    def _order_children(self, children: List[Game]) -> List[Game]:
+    def _order_children(self, children: List[Tuple[Union[Space, Tuple[Space, Space]], Direction, float]], depth: int, is_maximizer: bool) -> List[Tuple[Union[Space, Tuple[Space, Space]], Direction, float]]:
         return children
 
-    def _evaluate_move(self, result: Game, marbles: Union[Space, Tuple[Space, Space]], direction: Direction) -> float:
+    def _evaluate_move(self, result: Board, marbles: Union[Space, Tuple[Space, Space]], direction: Direction) -> float:
         return 0.0
 
-    def _end(self, result: Tuple[int, Union[Space, Tuple[Space, Space]], Direction]):
-        if self.marbles is None and self.direction is None:
-            return result
-        return (result[0], self.marbles, self.direction)
+    def _evaluate_moves(self, children: List[Board], moves: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]]) -> List[float]:
+        '''
+        Evaluations of all `moves` at once, `children` are the resulting positions
+        '''
+        return [self._evaluate_move(child, move[0], move[1]) for child, move in zip(children, moves)]
 
-    def _create_children(self) -> List[Tuple[Game, Union[Space, Tuple[Space, Space]], Direction, float]]:
-        result = []
-        for move in self.game.generate_legal_moves():
-            child = copy.deepcopy(self.game)
-            child.move(*move)
-            child.switch_player()
-            evaluation = self._evaluate_move(child, move[0], move[1])
-            result.append((child, move[0], move[1], evaluation))
-        result = self._order_children(result)
+    def _key(self) -> int:
+        '''
+        Key of `self.game` in the transposition table, whose values are from the perspective of `player`
+        '''
+        return self.game.key if self.player == Player.BLACK.value else self.game.key ^ ZOBRIST_PERSPECTIVE
+
+    def _create_children(self, depth: int, is_maximizer: bool, pv: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]] = None, hash_move: Tuple[Union[Space, Tuple[Space, Space]], Direction] = None) -> Iterable[Tuple[Union[Space, Tuple[Space, Space]], Direction, float]]:
+        '''
+        Legal moves with their evaluation, ordered by `_order_children`, or the moves of the staged
+        picker with `staged_ordering`. The positions are only needed for the evaluation, the search
+        itself applies the moves to `self.game` with `Board.make` and takes them back with
+        `Board.unmake`.
+        '''
+        if self.staged_ordering:
+            return islice(self._pick_children(depth, pv, hash_move), self.move_limit)
+        if self.history_ordering and depth >= self.history_depth:
+            result = self._history_scores(is_maximizer)
+        else:
+            moves = []
+            positions = []
+            for move, child in self.game.generate_children():
+                moves.append(move)
+                positions.append(child)
+            evaluations = self._evaluate_moves(positions, moves)
+            result = [(move[0], move[1], evaluation)
+                      for move, evaluation in zip(moves, evaluations)]
+        result = self._order_children(result, depth, is_maximizer)
+        if self.move_limit is not None:
+            result = result[:self.move_limit]
+        if self.history_ordering and not self._frontier(depth):
+            # at the frontier the evaluations are the exact values of the children already
+            for killer in reversed(history.killers[self.ply]):
+                if killer is not None:
+                    self._search_first(result, MOVES[killer])
+        if hash_move is not None:
+            self._search_first(result, hash_move)
+        if pv:
+            self._search_first(result, pv[0])
         # print(self.game)
         # print('---')
         # print(result)
         # print('---')
         return result
 
-    def pre_hook(self):
-        pass
+    def _pick_children(self, depth: int, pv: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]] = None, hash_move: Tuple[Union[Space, Tuple[Space, Space]], Direction] = None) -> Generator[Tuple[Union[Space, Tuple[Space, Space]], Direction, float], None, None]:
+        '''
+        Staged move picker: the move of the principal variation and the hash move, then the moves that
+        push opponent marbles, then the killer moves and then all other moves. Pushes are ordered by
+        `Board.move_score`, the other moves by their history score and then by `Board.move_score`.
 
-    def post_hook(self, value):
-        pass
+        Only the moves are generated up front. A position is built when the search reaches its move, and
+        only at the frontier, where its evaluation is the value of the leaf. Everywhere else the
+        evaluation is 0.0, the search applies the move to `self.game` itself.
+        '''
+        game = self.game
+        ply = self.ply
+        frontier = self._frontier(depth)
+        opponent = game.white if game.turn is Player.BLACK else game.black
+        first = []
+        if pv:
+            first.append(pv[0])
+        if hash_move is not None and hash_move not in first:
+            first.append(hash_move)
+        killers = [MOVES[code]
+                   for code in history.killers[ply] if code is not None]
+        found = {}
+        pushes = []
+        quiet = []
+        for move, own_after, opponent_after in game.generate_successors():
+            if move in first:
+                found[move] = (move, own_after, opponent_after)
+            elif opponent_after != opponent:
+                pushes.append((game.move_score(own_after, opponent_after),
+                               move, own_after, opponent_after))
+            elif move in killers:
+                found[move] = (move, own_after, opponent_after)
+            else:
+                quiet.append((history.score(MOVE_CODES[move], ply), game.move_score(own_after, opponent_after),
+                              move, own_after, opponent_after))
+
+        def child(move, own_after, opponent_after):
+            if frontier:
+                return (move[0], move[1], self._evaluate_move(game.child(own_after, opponent_after), move[0], move[1]))
+            return (move[0], move[1], 0.0)
+
+        for move in first:
+            if move in found:
+                yield child(*found.pop(move))
+        pushes.sort(key=itemgetter(0), reverse=True)
+        for entry in pushes:
+            yield child(*entry[1:])
+        for move in killers:
+            if move in found:
+                yield child(*found.pop(move))
+        quiet.sort(key=itemgetter(0, 1), reverse=True)
+        for entry in quiet:
+            yield child(*entry[2:])
+
+    def _frontier(self, depth: int) -> bool:
+        '''
+        Whether the evaluations of the children of a node with `depth` plies left are the values of the
+        leaves below it
+        '''
+        return depth == 1 and self.leaf_evaluations and not self.quiescence_depth
+
+    def _leaf(self, depth: int, alpha: float, beta: float, is_maximizer: bool) -> float:
+        '''
+        Value of a leaf, which is the heuristic or, at depth 0 with `quiescence_depth`, the result of
+        the quiescence search
+        '''
+        if depth == 0 and self.quiescence_depth:
+            return self._quiescence(alpha, beta, is_maximizer, self.quiescence_depth)
+        return self._heuristic(self.game)
+
+
+    def _quiescence(self, alpha: float, beta: float, is_maximizer: bool, depth: int) -> float:
+        '''
+        Searches only the pushes of `self.game` for up to `depth` plies, so that leaves are not
+        evaluated in the middle of an exchange of marbles. The player in turn may always stand pat,
+        i.e. take the heuristic value instead of pushing, which cuts off as soon as it reaches beta.
+        Pushes that push a marble off the board are searched first.
+        '''
+        game = self.game
+        value = self._heuristic(game)
+        if depth == 0 or utils.game_is_over(game.get_score()):
+            return value
+        if is_maximizer:
+            if value >= beta:
+                return value
+            alpha = max(alpha, value)
+        else:
+            if value <= alpha:
+                return value
+            beta = min(beta, value)
+        pushes = sorted(((game.move_score(own, opponent), move) for move, own, opponent in game.generate_pushes()),
+                        key=itemgetter(0), reverse=True)
+        for _, move in pushes:
+            if self.func:
+                self.func()
+            undo = game.make(move[0], move[1])
+            result = self._quiescence(
+                alpha, beta, not is_maximizer, depth - 1)
+            game.unmake(undo)
+            if is_maximizer:
+                value = max(value, result)
+                alpha = max(alpha, value)
+            else:
+                value = min(value, result)
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        return value
+
+    def _history_scores(self, is_maximizer: bool) -> List[Tuple[Union[Space, Tuple[Space, Space]], Direction, float]]:
+        '''
+        Legal moves with their killer or history score in place of the evaluation. The scores are
+        negated for the minimizer, so that `_order_children` sorts the best moves first for both.
+        '''
+        sign = 1 if is_maximizer else -1
+        ply = self.ply
+        return [(marbles, direction, sign * history.score(MOVE_CODES[(marbles, direction)], ply))
+                for marbles, direction in self.game.generate_legal_moves()]
+
+    def _cutoff(self, child: Tuple[Union[Space, Tuple[Space, Space]], Direction, float], depth: int):
+        '''
+        Called with the move that caused a beta cutoff in a node with `depth` plies left
+        '''
+        if self.history_ordering or self.staged_ordering:
+            history.cutoff(MOVE_CODES[(child[0], child[1])], self.ply, depth)
+
+    def _search_first(self, children: List[Tuple[Union[Space, Tuple[Space, Space]], Direction, float]], move: Tuple[Union[Space, Tuple[Space, Space]], Direction]):
+        for i, child in enumerate(children):
+            if child[0] == move[0] and child[1] == move[1]:
+                children.insert(0, children.pop(i))
+                break
+
+    def _visit(self, child: Tuple[Union[Space, Tuple[Space, Space]], Direction, float], depth: int, alpha: float, beta: float, is_maximizer: bool, pv: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]] = None, reduction: int = 0) -> float:
+        '''
+        Searches `child` of the node with `depth` plies left with the window from `alpha` to `beta`,
+        `reduction` plies shallower than usual. Returns its value and leaves its principal variation in
+        `variation`.
+        '''
+        if depth == 1 and self.leaf_evaluations:
+            if self.func:
+                self.func()
+            self.variation = ()
+            if not self.quiescence_depth:
+                return child[2]
+            # the leaf is searched further without a node of its own
+            undo = self.game.make(child[0], child[1])
+            value = self._quiescence(alpha, beta, not is_maximizer, self.quiescence_depth)
+            self.game.unmake(undo)
+            return value
+        undo = self.game.make(child[0], child[1])
+        if self.func:
+            self.func()
+        self.ply += 1
+        value = self._run(depth - 1 - reduction, alpha, beta, not is_maximizer,
+                          pv[1:] if pv and pv[0] == (child[0], child[1]) else None)[0]
+        self.ply -= 1
+        self.game.unmake(undo)
+        return value
+
+    def _is_push(self, child: Tuple[Union[Space, Tuple[Space, Space]], Direction, float]) -> bool:
+        return not isinstance(child[0], tuple) and self.game.inline_marbles_nums(child[0], child[1])[1] > 0
+
+    def _visit_late(self, index: int, child: Tuple[Union[Space, Tuple[Space, Space]], Direction, float], depth: int, alpha: float, beta: float, is_maximizer: bool, pv: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]] = None) -> float:
+        '''
+        `_visit` of the `index`-th child with late move reductions
+        '''
+        if index >= self.lmr_moves and depth >= self.lmr_depth and not self._is_push(child):
+            if is_maximizer and alpha > float('-inf'):
+                value = self._visit(child, depth, alpha, alpha + self.NULL_WINDOW,
+                                    is_maximizer, pv, self.lmr_reduction)
+                if value <= alpha:
+                    return value
+            elif not is_maximizer and beta < float('inf'):
+                value = self._visit(child, depth, beta - self.NULL_WINDOW, beta,
+                                    is_maximizer, pv, self.lmr_reduction)
+                if value >= beta:
+                    return value
+        return self._visit(child, depth, alpha, beta, is_maximizer, pv)
+
+    def _null_move(self, depth: int, alpha: float, beta: float, is_maximizer: bool) -> Union[Tuple[int, Union[Space, Tuple[Space, Space]], Direction], None]:
+        '''
+        Verified null-move pruning: if the player in turn is still above the window after passing, the
+        node is searched `null_move_reduction` plies shallower without null moves to verify that it
+        really fails high, which protects against zugzwang.
+
+        Returns:
+            The result to cut off with or `None`
+        '''
+        if not self.null_move_depth <= depth < self.initial_depth:
+            return None
+        static = self._heuristic(self.game)
+        if is_maximizer:
+            if static < beta:
+                return None
+            null_alpha, null_beta = beta - self.NULL_WINDOW, beta
+        else:
+            if static > alpha:
+                return None
+            null_alpha, null_beta = alpha, alpha + self.NULL_WINDOW
+        self.game.switch_player()
+        if self.func:
+            self.func()
+        self.ply += 1
+        value = self._run(depth - 1 - self.null_move_reduction, null_alpha, null_beta,
+                          not is_maximizer, null_moves=False)[0]
+        self.ply -= 1
+        self.game.switch_player()
+        if (value < beta) if is_maximizer else (value > alpha):
+            return None
+
+        # the verification searches this node again, so its result holds the best move of the node
+        if self.func:
+            self.func()
+        result = self._run(depth - self.null_move_reduction, alpha, beta, is_maximizer, null_moves=False)
+        if (result[0] < beta) if is_maximizer else (result[0] > alpha):
+            return None
+        return result
+
+    def _futility(self, depth: int, alpha: float, beta: float, is_maximizer: bool) -> Union[float, None]:
+        '''
+        The heuristic plus the futility margin of the node, if it cannot reach the window, else `None`.
+        Moves that do not push are skipped then. At the frontier with leaf evaluations, the children
+        cost nothing and are not skipped.
+        '''
+        if depth > len(self.FUTILITY_MARGINS) or depth == self.initial_depth or self._frontier(depth):
+            return None
+        static = self._heuristic(self.game)
+        margin = self.FUTILITY_MARGINS[depth - 1]
+        if is_maximizer and static + margin <= alpha:
+            return static + margin
+        if not is_maximizer and static - margin >= beta:
+            return static - margin
+        return None
+
+    def pre_hook(self, depth: int, alpha: float, beta: float) -> Union[Tuple[Union[Tuple[int, Union[Space, Tuple[Space, Space]], Direction], None], float, float, Union[Tuple[Union[Space, Tuple[Space, Space]], Direction], None]], None]:
+        '''
+        Called before a node with `depth` plies left and the window from `alpha` to `beta` is searched
+
+        Returns:
+            `None` or the result to end the node with, or `None` to search it, together with the window
+            to search it with and the move to search first
+        '''
+        return None
+
+    def post_hook(self, value: Tuple[int, Union[Space, Tuple[Space, Space]], Direction], depth: int, alpha: float, beta: float):
+        '''
+        Called with the result of a node that was searched with `depth` plies left and the window from
+        `alpha` to `beta`
+        '''
 
     def run(self) -> Tuple[int, Union[Space, Tuple[Space, Space]], Direction]:
-        pre = self.pre_hook()
-        if pre != None:
-            return pre
+        result = self._run(self.depth, self.alpha, self.beta, self.is_maximizer, self.pv)
+        if self.marbles is None and self.direction is None:
+            return result
+        return (result[0], self.marbles, self.direction)
 
-        if self.depth == 0 or utils.game_is_over(self.game.get_score()):
-            return self._end((self._heuristic(self.game), None, None))
-        if self.is_maximizer:
+    def _run(self, depth: int, alpha: float, beta: float, is_maximizer: bool, pv: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]] = None, null_moves: bool = True) -> Tuple[int, Union[Space, Tuple[Space, Space]], Direction]:
+        '''
+        Searches the node of `self.game` with `depth` plies left and the window from `alpha` to `beta`.
+        `null_moves` is off in the nodes of null-move searches and their verification.
+
+        Returns:
+            The value of the node with its best move. The principal variation is left in `variation`.
+        '''
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchTimeout()
+
+        alpha_orig, beta_orig = alpha, beta
+        hash_move = None
+        pre = self.pre_hook(depth, alpha, beta)
+        if pre is not None:
+            result, alpha, beta, hash_move = pre
+            if result is not None:
+                self.variation = ()
+                return result
+
+        if depth == 0 or utils.game_is_over(self.game.get_score()):
+            self.variation = ()
+            return (self._leaf(depth, alpha, beta, is_maximizer), None, None)
+        if self.null_move_pruning and null_moves:
+            null_move = self._null_move(depth, alpha, beta, is_maximizer)
+            if null_move is not None:
+                self.post_hook(null_move, depth, alpha_orig, beta_orig)
+                return null_move
+        futility = self._futility(depth, alpha, beta, is_maximizer) if self.futility_pruning else None
+        late_move_reductions = self.late_move_reductions
+        variation = ()
+        if is_maximizer:
             value = (float('-inf'), None, None)
-            for child in self._create_children():
-                value = max(value, self.__class__(
-                    child[0], self.player, self.depth - 1, self.alpha, self.beta, False, child[1], child[2], func=self.func, initial_depth=self.initial_depth).run(), key=itemgetter(0))
-                self.alpha = max(self.alpha, value[0])
-                if self.alpha >= self.beta:
-                    break
+            for i, child in enumerate(self._create_children(depth, is_maximizer, pv, hash_move)):
+                if futility is not None and not self._is_push(child):
+                    # the move cannot raise alpha
+                    if futility > value[0]:
+                        value = (futility, child[0], child[1])
+                    continue
+                if late_move_reductions:
+                    result = self._visit_late(i, child, depth, alpha, beta, is_maximizer, pv)
+                else:
+                    result = self._visit(child, depth, alpha, beta, is_maximizer, pv)
+                if result > value[0]:
+                    value = (result, child[0], child[1])
+                    variation = [(child[0], child[1]), *self.variation]
+                    if result > alpha:
+                        alpha = result
+                        if alpha >= beta:
+                            self._cutoff(child, depth)
+                            break
         else:
             value = (float('inf'), None, None)
-            for child in self._create_children():
-                value = min(value, self.__class__(
-                    child[0], self.player, self.depth - 1, self.alpha, self.beta, True, child[1], child[2], func=self.func, initial_depth=self.initial_depth).run(), key=itemgetter(0))
-                self.beta = min(self.beta, value[0])
-                if self.beta <= self.alpha:
-                    break
-
-        self.post_hook(value)
-        return self._end(value)
+            for i, child in enumerate(self._create_children(depth, is_maximizer, pv, hash_move)):
+                if futility is not None and not self._is_push(child):
+                    # the move cannot lower beta
+                    if futility < value[0]:
+                        value = (futility, child[0], child[1])
+                    continue
+                if late_move_reductions:
+                    result = self._visit_late(i, child, depth, alpha, beta, is_maximizer, pv)
+                else:
+                    result = self._visit(child, depth, alpha, beta, is_maximizer, pv)
+                if result < value[0]:
+                    value = (result, child[0], child[1])
+                    variation = [(child[0], child[1]), *self.variation]
+                    if result < beta:
+                        beta = result
+                        if beta <= alpha:
+                            self._cutoff(child, depth)
+                            break
+
+        self.variation = variation
+        self.post_hook(value, depth, alpha_orig, beta_orig)
+        return value
 
 
 class AlphaBetaSimple(AlphaBetaBase):
-    def _order_children(self, children):
-        children.sort(key=itemgetter(3), reverse=self.is_maximizer)
+    leaf_evaluations = True
+
+    def _order_children(self, children, depth, is_maximizer):
+        children.sort(key=itemgetter(2), reverse=is_maximizer)
         return children
 
-    def _evaluate_move(self, result: Game, marbles: Union[Space, Tuple[Space, Space]], direction: Direction) -> float:
+    def _evaluate_move(self, result: Board, marbles: Union[Space, Tuple[Space, Space]], direction: Direction) -> float:
         return self._heuristic(result)
 
-    def _count_heuristics(self, game: Game) -> dict:
+    def _evaluate_moves(self, children: List[Board], moves: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]]) -> List[float]:
+        return self._batch_heuristic(children).tolist()
+
+    def _batch_heuristic(self, children: List[Board]) -> np.ndarray:
+        '''
+        `_heuristic` of all `children` in one vectorized pass over the running totals of the boards
+        '''
+        totals = np.array([child.adjacency + child.distance + child.get_score() for child in children])
+        own, opp = (0, 1) if self.player == Player.BLACK.value else (1, 0)
+        score = totals[:, 4:]
+
+        adjacency = totals[:, own] - totals[:, opp]
+        distance = totals[:, 2 + own] - totals[:, 2 + opp]
+        marble_ratio = score[:, own] - score[:, opp]
+
+        w_0 = 1
+        w_1 = -1.5
+        w_2 = 100
+        heuristic = w_0 * adjacency + w_1 * distance + w_2 * marble_ratio
+
+        # a side with 8 marbles left has lost
+        w_0 = 100000
+        return np.where(score[:, opp] == 8, w_0, np.where(score[:, own] == 8, -w_0, heuristic))
+
+    def _count_heuristics(self, game: Union[Game, Board]) -> dict:
+        if isinstance(game, Game):
+            game = Board.from_game(game)
+        adjacency, distance = game.compute_totals()
         result = {}
-        result['sum_adjacency'] = defaultdict(int)
-        result['sum_distance'] = defaultdict(int)
-        center = Cube.from_board_array(4, 4)
-
-        for player in game.marbles.keys():
-            for x in game.marbles[player].keys():
-                for y, current_marble in game.marbles[player][x].items():
-                    c = Cube.from_board_array(x, y)
-                    # adjacency
-                    for neighbor in Cube.neighbor_indices():
-                        n = Cube(neighbor[0], neighbor[1], neighbor[2]).add(c)
-                        xn, yn = n.to_board_array()
-                        if yn < 0 or xn < 0:
-                            continue
-                        try:
-                            neighbor_marble = game.board[yn][xn]
-                            if neighbor_marble == current_marble:
-                                result['sum_adjacency'][current_marble.value] += 1
-                        except IndexError:
-                            continue
-                    # distance
-                    result['sum_distance'][current_marble.value] += c.distance(
-                        center)
+        result['sum_adjacency'] = {
+            Player.BLACK.value: adjacency[0], Player.WHITE.value: adjacency[1]}
+        result['sum_distance'] = {
+            Player.BLACK.value: distance[0], Player.WHITE.value: distance[1]}
         return result
 
-    def _heuristic(self, game: Game) -> float:
+    def _heuristic(self, game: Board) -> float:
         '''
+        Linear combination of the adjacency, the distance to the center and the marbles of the player
+        minus those of the opponent. All terms are kept up to date by the board, so this is O(1).
         '''
+        if isinstance(game, Game):
+            game = Board.from_game(game)
         score = game.get_score()
         if utils.game_is_over(score):
             w_0 = 100000
             winner = utils.get_winner(score)
             return w_0 * 1 if winner.value == self.player else w_0 * -1
-        counts = self._count_heuristics(game)
+        own, opp = (0, 1) if self.player == Player.BLACK.value else (1, 0)
 
-        adjacency = counts['sum_adjacency'][self.player] - \
-            counts['sum_adjacency'][self.not_player]
-
-        distance = counts['sum_distance'][self.player] - \
-            counts['sum_distance'][self.not_player]
-
-        counter = score[0] if self.player == Player.BLACK.value else score[1]
-        denominator = score[1] if self.player == Player.BLACK.value else score[0]
-        marble_ratio = counter - denominator
+        adjacency = game.adjacency[own] - game.adjacency[opp]
+        distance = game.distance[own] - game.distance[opp]
+        marble_ratio = score[own] - score[opp]
 
         w_0 = 1
         w_1 = -1.5
@@ -234,7 +691,12 @@ class AlphaBetaSimple(AlphaBetaBase):
 
 
 class AlphaBetaSimpleOrdering(AlphaBetaSimple):
-    def _evaluate_move(self, result: Game, marbles: Union[Space, Tuple[Space, Space]], direction: Direction) -> float:
+    leaf_evaluations = False
+
+    def _evaluate_moves(self, children: List[Board], moves: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]]) -> List[float]:
+        return AlphaBetaBase._evaluate_moves(self, children, moves)
+
+    def _evaluate_move(self, result: Board, marbles: Union[Space, Tuple[Space, Space]], direction: Direction) -> float:
         old_score = self.game.get_score()
         new_score = result.get_score()
         if utils.game_is_over(new_score):
@@ -251,13 +713,10 @@ class AlphaBetaSimpleOrdering(AlphaBetaSimple):
         multiple = 0
         attacking = 0
         if isinstance(marbles, tuple):
-            c1 = Cube.from_board_array(*space_to_board_indices(marbles[0]))
-            c2 = Cube.from_board_array(*space_to_board_indices(marbles[1]))
-            multiple = c1.distance(c2)
+            multiple = distance(marbles[0], marbles[1])
         else:
-            line = line_to_edge(marbles, direction)
-            own_marbles_num, opp_marbles_num = self.game._inline_marbles_nums(
-                line)
+            own_marbles_num, opp_marbles_num = self.game.inline_marbles_nums(
+                marbles, direction)
             multiple = own_marbles_num - 1
             if opp_marbles_num > 0:
                 attacking += 1
@@ -273,128 +732,427 @@ class AlphaBetaSimpleOrdering(AlphaBetaSimple):
 
 
 class AlphaBetaAdvanced(AlphaBetaSimple):
-    def __init__(self, game, perspective, depth=3, alpha=float('-inf'), beta=float('inf'), is_maximizer=True, marbles=None, direction=None, func=None):
+    staged_ordering = True
+
+    def __init__(self, game, perspective, depth=3, alpha=float('-inf'), beta=float('inf'), is_maximizer=True, marbles=None, direction=None, func=None, initial_depth=3, pv=None, deadline=None, ply=0):
         super().__init__(game, perspective, depth=depth, alpha=alpha, beta=beta,
-                         is_maximizer=is_maximizer, marbles=marbles, direction=direction, func=func)
-        self.key = storage.get_key(self.game.marbles)
-
-    def pre_hook(self):
-        result = storage.get_tt_value(self.key, self.game.marbles, self.depth)
-        if result is not None:
-            flag, value = result[0], result[1]
-            if flag == 'lower':
-                return self._end((max(self.alpha, value[0]), value[1], value[2]))
-            elif flag == 'upper':
-                return self._end((min(self.beta, value[0]), value[1], value[2]))
-        return None
+                         is_maximizer=is_maximizer, marbles=marbles, direction=direction, func=func, initial_depth=initial_depth, pv=pv, deadline=deadline, ply=ply)
+
+    def pre_hook(self, depth, alpha, beta):
+        entry = storage.probe(self._key())
+        if entry is None:
+            return None
+        flag, value, stored_depth = entry
+        hash_move = (value[1], value[2]) if value[1] is not None else None
+        if stored_depth < depth:
+            return None, alpha, beta, hash_move
+        if flag == 'exact':
+            return value, alpha, beta, hash_move
+        elif flag == 'lower':
+            alpha = max(alpha, value[0])
+        elif flag == 'upper':
+            beta = min(beta, value[0])
+        if alpha >= beta:
+            return value, alpha, beta, hash_move
+        return None, alpha, beta, hash_move
+
+    def post_hook(self, value, depth, alpha, beta):
+        if value[0] <= alpha:
+            flag = 'upper'
+        elif value[0] >= beta:
+            flag = 'lower'
+        else:
+            flag = 'exact'
+
+        storage.set_tt_value(self._key(), value, flag, depth)
+
 
-    def post_hook(self, value):
-        tt_entry = {'value': None, 'flag': None, 'depth': None}
-        tt_entry['value'] = value
-        if value[0] <= self.alpha:
-            tt_entry['flag'] = 'upper'
-        elif value[0] >= self.beta:
-            tt_entry['flag'] = 'lower'
+class AlphaBetaHistory(AlphaBetaAdvanced):
+    staged_ordering = False
+    history_ordering = True
+
+
+class AlphaBetaQuiescence(AlphaBetaAdvanced):
+    '''
+    `AlphaBetaAdvanced` that searches pushes beyond the leaves until the position is quiet, so that it
+    plays like a search one ply deeper in exchanges of marbles
+    '''
+    quiescence_depth = 4
 
-        tt_entry['depth'] = self.depth
-        tt_entry['board'] = self.game.marbles.copy()
 
-        storage.set_tt_value(self.key, tt_entry)
+class AlphaBetaReduced(AlphaBetaAdvanced):
+    '''
+    `AlphaBetaAdvanced` with late move reductions, null-move and futility pruning
+    '''
+    late_move_reductions = True
+    null_move_pruning = True
+    futility_pruning = True
 
 
 class AlphaBetaSimpleUnordered(AlphaBetaSimple):
-    def _order_children(self, children):
+    def _order_children(self, children, depth, is_maximizer):
         return children
 
 
 class AlphaBetaAdvancedFast(AlphaBetaAdvanced):
-    def _order_children(self, children):
-        return super()._order_children(children)[:30]
+    move_limit = 30
 
 
-class PVS(AlphaBetaSimple):
-    def _order_children(self, children):
-        children = super()._order_children(children)
+class PVS(AlphaBetaAdvanced):
+    '''
+    Principal variation search in negamax form: the first child is searched with the full window, all
+    other children with a null window above alpha, which only proves that they are not better. A child
+    that fails high is searched again with the window between its value and beta.
+
+    With a `pool`, the root waits for its eldest brother and then sends the younger brothers in batches
+    to the worker processes (Young Brothers Wait). All nodes below the root are searched sequentially.
+    '''
+
+    def __init__(self, *args, pool: WorkerPool = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = pool
+
+    def _search(self, child: Tuple[Union[Space, Tuple[Space, Space]], Direction, float], depth: int, alpha: float, beta: float, is_maximizer: bool, pv: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]]) -> float:
+        '''
+        Searches `child` with a window from the point of view of the player in turn and returns its
+        value from that point of view. The principal variation is left in `variation`.
+        '''
+        if is_maximizer:
+            return self._visit(child, depth, alpha, beta, is_maximizer, pv)
+        return -self._visit(child, depth, -beta, -alpha, is_maximizer, pv)
+
+    def _search_younger_brothers(self, children: List[Tuple[Union[Space, Tuple[Space, Space]], Direction, float]], depth: int, alpha: float, beta: float) -> List[Tuple[float, List[Tuple[Union[Space, Tuple[Space, Space]], Direction]]]]:
+        '''
+        Values and principal variations of `children` searched by the worker processes
+        '''
+        position = self.game.pack()
+        tasks = [(position, self.__class__, self.player, depth - 1, alpha, beta, [MOVE_CODES[(child[0], child[1])] for child in batch], self.initial_depth, self.deadline)
+                 for batch in self.pool.batches(children)]
+        results = {}
+        for batch, count, (pid, stats) in self.pool.map(search_moves, tasks):
+            self.pool.stats[pid] = stats
+            for code, result, variation in batch:
+                results[code] = (result, variation)
+            if self.func:
+                for _ in range(count):
+                    self.func()
+        return [results[MOVE_CODES[(child[0], child[1])]] for child in children]
+
+    def _run(self, depth, alpha, beta, is_maximizer, pv=None, null_moves=True):
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchTimeout()
+
+        alpha_orig, beta_orig = alpha, beta
+        hash_move = None
+        pre = self.pre_hook(depth, alpha, beta)
+        if pre is not None:
+            result, alpha, beta, hash_move = pre
+            if result is not None:
+                self.variation = ()
+                return result
+
+        if depth == 0 or utils.game_is_over(self.game.get_score()):
+            self.variation = ()
+            return (self._leaf(depth, alpha, beta, is_maximizer), None, None)
+        children = iter(self._create_children(depth, is_maximizer, pv, hash_move))
+        eldest = next(children, None)
+        if eldest is None:
+            # every move was cut by the ordering
+            self.variation = ()
+            return (self._heuristic(self.game), None, None)
+
+        # the window and all values from the point of view of the player in turn
+        sign = 1 if is_maximizer else -1
+        if not is_maximizer:
+            alpha, beta = -beta, -alpha
+
+        score = self._search(eldest, depth, alpha, beta, is_maximizer, pv)
+        best = (score, eldest[0], eldest[1])
+        variation = [(eldest[0], eldest[1]), *self.variation]
+        alpha = max(alpha, score)
+
+        if alpha < beta:
+            if self.pool is not None and self.ply == 0 and depth >= 2:
+                # the workers need all younger brothers at once
+                children = list(children)
+                results = self._search_younger_brothers(children, depth, alpha, beta) if children else []
+            else:
+                results = None
+            for i, child in enumerate(children):
+                if results is not None:
+                    score, self.variation = results[i]
+                else:
+                    score = self._search(child, depth, alpha, alpha + self.NULL_WINDOW, is_maximizer, pv)
+                    if alpha < score < beta:
+                        score = self._search(child, depth, score, beta, is_maximizer, pv)
+                if score > best[0]:
+                    best = (score, child[0], child[1])
+                    variation = [(child[0], child[1]), *self.variation]
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    self._cutoff(child, depth)
+                    break
+
+        value = (sign * best[0], best[1], best[2])
+        self.variation = variation
+        self.post_hook(value, depth, alpha_orig, beta_orig)
+        return value
+
+
+class PVSFunnel(PVS):
+    '''
+    `PVS` that only searches the best moves after ordering, fewer the deeper the node
+    '''
+    # the width of the funnel depends on the evaluations of all children
+    staged_ordering = False
+
+    def _order_children(self, children, depth, is_maximizer):
+        children = super()._order_children(children, depth, is_maximizer)
         # build tightening funnel
         min_cutoff = 0.4
         max_cutoff = 0.1
 
-        if self.depth == self.initial_depth:
+        if depth == self.initial_depth:
             cutoff = min_cutoff
-        elif self.depth == 1:
+        elif depth == 1:
             cutoff = max_cutoff
         else:
             cutoff = (((min_cutoff - max_cutoff) * (1 - ((self.initial_depth -
-                                                          self.depth) / self.initial_depth))) + max_cutoff)**1.2
+                                                          depth) / self.initial_depth))) + max_cutoff)**1.2
         width = int(len(children) * cutoff)
         # print(
-        # f'Width: {width} vs {len(children)} Depth: {self.depth} Cutoff: {cutoff}')
+        # f'Width: {width} vs {len(children)} Depth: {depth} Cutoff: {cutoff}')
         return children[:width]
 
-    def run(self) -> Tuple[int, Union[Space, Tuple[Space, Space]], Direction]:
-        if self.depth == 0 or utils.game_is_over(self.game.get_score()):
-            return self._end((self._heuristic(self.game), None, None))
 
-        children = self._create_children()
-        succ_node = children.pop(0)
-        score = self.__class__(
-            succ_node[0], self.player, self.depth - 1, self.alpha, self.beta, not self.is_maximizer, succ_node[1], succ_node[2], func=self.func, initial_depth=self.initial_depth).run()
-        if score[0] > self.beta:
-            return self._end((self.beta, self.marbles, self.direction))
-        if score[0] > self.alpha:
-            self.alpha = score[0]
+class LazySMPHelper(AlphaBetaAdvanced):
+    '''
+    Search of a helper process of `LazySMPPlayer`. The move ordering gets some noise, so the helpers
+    search the moves in different orders and fill the shared transposition table with different parts
+    of the tree. Stops as soon as `stop_flag` is set.
+    '''
+    # the noise is added to the evaluations of all children
+    staged_ordering = False
+    noise = 2.0
+    generator = random.Random()
+
+    def _order_children(self, children, depth, is_maximizer):
+        # only the order changes, the evaluations are kept as they are the values of frontier leaves
+        children.sort(key=lambda child: child[2] + self.generator.uniform(0, self.noise),
+                      reverse=is_maximizer)
+        return children
 
-        with Pool() as pool:
-            children = pool.starmap(run, product(children, [self]))
+    def _run(self, depth, alpha, beta, is_maximizer, pv=None, null_moves=True):
+        if stop_flag is not None and stop_flag.value:
+            raise SearchTimeout()
+        return super()._run(depth, alpha, beta, is_maximizer, pv, null_moves)
 
-        for result in children:
-            if (result[0] > self.beta):
-                return self._end((self.beta, self.marbles, self.direction))
-            if (result[0] > self.alpha):
-                score = result
-                self.alpha = result[0]
 
-        return self._end((self.alpha, score[1], score[2]))
+def use_lazy_smp(shared: utils.Storage, stop):
+    '''
+    Initializes a helper process of `LazySMPPlayer` with the shared transposition table and stop flag
+    '''
+    global stop_flag
+    use_storage(shared)
+    stop_flag = stop
 
 
-class AlphaBetaPlayer(AbstractPlayer):
+def lazy_smp_search(position: Tuple[int, int, int], perspective: int, index: int, max_depth: int, deadline: float) -> Tuple[int, int, Tuple[int, dict]]:
     '''
+    Iterative deepening of a helper process until `max_depth`, the deadline or the stop flag. Odd
+    helpers start one ply deeper, so the helpers are staggered by depth as well.
+
+    Returns:
+        The deepest completed depth, the number of nodes visited and the process id together with the
+        statistics of the transposition table
     '''
+    global nodes
+    nodes = 0
+    LazySMPHelper.generator = random.Random(index)
+    board = Board.unpack(position)
+    completed = 0
+    depth = 1 + index % 2
+    try:
+        while depth <= max_depth:
+            LazySMPHelper(board, perspective, depth=depth, initial_depth=depth,
+                          func=count_nodes, deadline=deadline).run()
+            completed = depth
+            depth += 1
+    except SearchTimeout:
+        pass
+    return completed, nodes, (os.getpid(), storage.stats())
 
-    def __init__(self, *args, verbose=True, **kwargs):
+
+class AlphaBetaPlayer(AbstractPlayer):
+    '''
+    Searches to a fixed `depth` or, if `max_time` is given, deepens one ply at a time until the time in
+    seconds is used up and plays the best move of the last completed depth.
+    '''
+    MAX_DEPTH = 100
+    # half width of the first window around the expected score of the root, `None` for a full window
+    ASPIRATION_WINDOW = 15
+    # the window grows by this factor after each failure, beyond `ASPIRATION_LIMIT` it is unbounded
+    ASPIRATION_GROWTH = 4
+    ASPIRATION_LIMIT = 1000
+
+    def __init__(self, *args, max_time=None, verbose=True, **kwargs):
         super().__init__(*args, **kwargs)
+        self.max_time = max_time
         self.verbose = verbose
+        # score of the previous move and the number of root searches and re-searches of the last turn
+        self.score = None
+        self.root_searches = 0
+        self.re_searches = 0
 
     @ property
     def depth(self):
         return 3
 
     def __str__(self):
+        if self.max_time is not None:
+            return f'AlphaBetaPlayer max_time: {self.max_time} algo: {str(self.get_algorithm())}'
         return f'AlphaBetaPlayer depth: {self.depth} algo: {str(self.get_algorithm())}'
 
     def get_algorithm(self):
         return AlphaBetaSimple
 
+    def algorithm_kwargs(self) -> dict:
+        '''
+        Additional keyword arguments for the root node of every search
+        '''
+        return {}
+
+    def close(self):
+        '''
+        Called at the end of a game to release resources like worker processes
+        '''
+
+    def search_root(self, board: Board, perspective: int, depth: int, guess: float = None, pv: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]] = None, deadline: float = None) -> Tuple[Tuple[int, Union[Space, Tuple[Space, Space]], Direction], List[Tuple[Union[Space, Tuple[Space, Space]], Direction]]]:
+        '''
+        Searches the root with an aspiration window around `guess`, the expected score. If the score
+        falls outside of the window, the window is widened on that side and the root searched again.
+
+        Returns:
+            The result and the principal variation
+        '''
+        alpha, beta = float('-inf'), float('inf')
+        delta = self.ASPIRATION_WINDOW
+        if guess is not None and delta is not None:
+            alpha, beta = guess - delta, guess + delta
+        while True:
+            self.root_searches += 1
+            root = self.get_algorithm()(board, perspective, func=count_nodes, depth=depth, initial_depth=depth,
+                                        alpha=alpha, beta=beta, pv=pv, deadline=deadline, **self.algorithm_kwargs())
+            result = root.run()
+            value = result[0]
+            if alpha < value < beta or (value <= alpha and alpha == float('-inf')) or (value >= beta and beta == float('inf')):
+                return result, root.variation
+            self.re_searches += 1
+            delta *= self.ASPIRATION_GROWTH
+            if value <= alpha:
+                alpha = guess - delta if delta <= self.ASPIRATION_LIMIT else float('-inf')
+            else:
+                beta = guess + delta if delta <= self.ASPIRATION_LIMIT else float('inf')
+
+    def iterative_deepening(self, game: Game) -> Tuple[Tuple[int, Union[Space, Tuple[Space, Space]], Direction], int]:
+        '''
+        Searches with increasing depth until `max_time` is up. Every iteration searches the principal
+        variation of the previous one first, reuses the transposition table and starts with an
+        aspiration window around the score of the previous iteration.
+
+        Returns:
+            The result and the depth of the last completed iteration
+        '''
+        deadline = time.time() + self.max_time
+        board = Board.from_game(game)
+        result = None
+        pv = None
+        depth = 0
+        while depth < self.MAX_DEPTH and time.time() < deadline:
+            # the first iteration always completes, so there is a move to play
+            try:
+                result, pv = self.search_root(board, game.turn.value, depth + 1, guess=result[0] if result is not None else self.score,
+                                              pv=pv, deadline=deadline if result is not None else None)
+            except SearchTimeout:
+                break
+            depth += 1
+        return result, depth
+
+    def search(self, game: Game) -> Tuple[Tuple[int, Union[Space, Tuple[Space, Space]], Direction], int]:
+        '''
+        Searches to the fixed depth or with iterative deepening if `max_time` is set. The fixed depth
+        search starts with an aspiration window around the score of the previous move.
+
+        Returns:
+            The result and the depth that was searched
+        '''
+        if self.max_time is None:
+            result, _ = self.search_root(Board.from_game(
+                game), game.turn.value, self.depth, guess=self.score)
+            return result, self.depth
+        return self.iterative_deepening(game)
+
     def turn(self, game: Game, moves_history: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]]) -> Tuple[Union[Space, Tuple[Space, Space]], Direction]:
         global nodes
         nodes = 0
+        self.root_searches = 0
+        self.re_searches = 0
+        storage.new_generation()
+        history.age()
 
-        result = self.get_algorithm()(
-            game, game.turn.value, func=count_nodes, depth=self.depth, initial_depth=self.depth).run()
+        result, depth = self.search(game)
+        self.score = result[0]
         if self.verbose:
             print(f'Heuristic: {result[0]}')
             print(f'Nodes visited: {nodes}')
+            print(f'Depth: {depth}')
+            print(
+                f'Root searches: {self.root_searches} ({self.re_searches} re-searches)')
 
         return [result[1], result[2]]
 
 
 class PVSPlayer(AlphaBetaPlayer):
+    '''
+    Searches the moves of the root in parallel with `workers` processes, by default one per core. The
+    player and its workers share one transposition table, both are created for the first turn of a
+    game and released by `close`.
+    '''
+
+    def __init__(self, *args, workers=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.workers = workers
+        self.storage = None
+        self.pool = None
+
     @ property
     def depth(self):
         return 5
 
     def get_algorithm(self):
-        return PVS
+        return PVSFunnel
+
+    def algorithm_kwargs(self) -> dict:
+        return {'pool': self.pool}
+
+    def turn(self, game: Game, moves_history: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]]) -> Tuple[Union[Space, Tuple[Space, Space]], Direction]:
+        if self.pool is None:
+            self.storage = utils.SharedStorage()
+            self.pool = WorkerPool(self.workers, use_storage, (self.storage,))
+        use_storage(self.storage)
+        move = super().turn(game, moves_history)
+        if self.verbose:
+            for pid, stats in sorted(self.pool.stats.items()):
+                print(
+                    f'Worker {pid}: hit rate {stats["hit_rate"]:.2f} ({stats["hits"]} hits, {stats["stores"]} stores)')
+        return move
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            release_storage(self.storage)
+            self.pool = None
+            self.storage = None
 
 
 class PVSPlayerShallow(PVSPlayer):
@@ -403,20 +1161,104 @@ class PVSPlayerShallow(PVSPlayer):
         return 3
 
 
+class LazySMPPlayer(AlphaBetaPlayer):
+    '''
+    Lazy SMP: `workers - 1` helper processes run their own iterative deepening searches over a
+    transposition table that they share with the main search in this process. The helpers only make
+    the table more useful to the main search, the move is always the one that the main search finds.
+    '''
+
+    def __init__(self, *args, workers=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.workers = workers or cpu_count()
+        self.storage = None
+        self.stop = None
+        self.pool = None
+
+    def __str__(self):
+        return f'{super().__str__()} workers: {self.workers}'
+
+    @ property
+    def depth(self):
+        return 4
+
+    def get_algorithm(self):
+        return AlphaBetaAdvanced
+
+    def search(self, game: Game) -> Tuple[Tuple[int, Union[Space, Tuple[Space, Space]], Direction], int]:
+        global nodes
+        if self.storage is None:
+            self.storage = utils.SharedStorage()
+            self.stop = RawValue('b', 0)
+            if self.workers > 1:
+                self.pool = WorkerPool(
+                    self.workers - 1, use_lazy_smp, (self.storage, self.stop))
+        use_storage(self.storage)
+        if self.pool is None:
+            return super().search(game)
+
+        self.stop.value = 0
+        # without a time limit, the helpers go one ply deeper than the main search until it is done
+        max_depth = self.depth + 1 if self.max_time is None else self.MAX_DEPTH
+        deadline = time.time() + self.max_time if self.max_time is not None else None
+        position = Board.from_game(game).pack()
+        helpers = self.pool.map_async(lazy_smp_search, [(position, game.turn.value, index, max_depth, deadline)
+                                                        for index in range(1, self.workers)])
+        try:
+            result = super().search(game)
+        finally:
+            self.stop.value = 1
+            depths = []
+            for depth, count, (pid, stats) in helpers.get():
+                nodes += count
+                depths.append(depth)
+                self.pool.stats[pid] = stats
+        if self.verbose:
+            print(f'Helper depths: {depths}')
+        return result
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        if self.storage is not None:
+            release_storage(self.storage)
+            self.storage = None
+
+
 class AlphaBetaPlayerFast(AlphaBetaPlayer):
     def get_algorithm(self):
         return AlphaBetaAdvancedFast
 
 
+class AlphaBetaPlayerQuiescence(AlphaBetaPlayer):
+    '''
+    Searches one ply less than `AlphaBetaPlayer` and extends the leaves with a quiescence search
+    '''
+    @ property
+    def depth(self):
+        return 2
+
+    def get_algorithm(self):
+        return AlphaBetaQuiescence
+
+
 @ dataclass
 class Move:
+    __slots__ = ('move', 'value')
+
     move: Tuple[Union[Space, Tuple[Space, Space]], Direction]
     value: int
-    next_state: Game
 
 
 class MctsNode:
-    def __init__(self, game: Game, parent: MctsNode, marbles: Union[Space, Tuple[Space, Space]] = None, direction: Direction = None):
+    '''
+    Node of the search tree. The moves of a node are only generated and scored when they are needed
+    for the first time, i.e. when the node is expanded, and the position after a move is only built
+    for the child that is created with it.
+    '''
+
+    def __init__(self, game: Board, parent: MctsNode, marbles: Union[Space, Tuple[Space, Space]] = None, direction: Direction = None):
         self.game = game
         self.parent = parent
         self.marbles = marbles
@@ -424,7 +1266,7 @@ class MctsNode:
         self.black_stats = 0
         self.white_stats = 0
         self.no_games = 0
-        self.moves = self.create_ordered_moves()
+        self._moves = None
         self.children = []
         self.uct = float('inf')
 
@@ -432,23 +1274,37 @@ class MctsNode:
     def stats(self) -> (int, int):
         return (self.black_stats / self.no_games if self.no_games != 0 else 0, self.white_stats / self.no_games if self.no_games != 0 else 0)
 
+    @ property
+    def moves(self) -> List[Move]:
+        '''
+        The moves that have no child yet, the best one for the player in turn last
+        '''
+        if self._moves is None:
+            self._moves = self.create_ordered_moves()
+        return self._moves
+
     def create_ordered_moves(self) -> List[Move]:
         moves = []
-        for move in self.game.generate_legal_moves():
-            next_state = copy.deepcopy(self.game)
-            next_state.move(*move)
-            next_state.switch_player()
-            value = Heuristics.evaluate_move(Player.BLACK.value,
-                                             self.game, next_state, *move)
+        for move, own, opponent in self.game.generate_successors():
+            value = Heuristics.evaluate_score(Player.BLACK.value,
+                                              self.game, self.game.successor_score(own, opponent), *move)
             moves.append(Move(
                 move=move,
                 value=value,
-                next_state=next_state,
             ))
         reverse = False if self.game.turn == Player.BLACK else True
         moves.sort(key=lambda x: x.value, reverse=reverse)
         return moves
 
+    def next_state(self, move: Tuple[Union[Space, Tuple[Space, Space]], Direction]) -> Board:
+        '''
+        Position after `move`
+        '''
+        state = self.game.copy()
+        state.move(*move)
+        state.switch_player()
+        return state
+
     def update_uct(self):
         mean = self.black_stats / self.no_games
         no_games_parent = math.log(
@@ -459,8 +1315,8 @@ class MctsNode:
     def append_child(self, child: MctsNode):
         self.children.append(child)
 
-    def update_stats(self, new: Tuple[int, int]):
-        self.no_games += 1
+    def update_stats(self, new: Tuple[int, int], games: int = 1):
+        self.no_games += games
         self.black_stats += new[0]
         self.white_stats += new[1]
         self.update_uct()
@@ -472,39 +1328,106 @@ class MctsNode:
 
 
 class MonteCarloSearch(Algorithm):
-    def __init__(self, game: Game, max_time=5, max_plies=200):
-        self.game = game
+    # games that a playout in progress counts as lost for the nodes on its path, so the selections of
+    # the playouts that run at the same time spread over the tree
+    VIRTUAL_LOSS = 1
+
+    def __init__(self, game: Union[Game, Board], max_time=5, max_plies=200, rollouts: int = None, pool: WorkerPool = None, root: MctsNode = None):
+        '''
+        Args:
+            rollouts: Number of games that are played out from every leaf at once with
+                `playouts.batch_playout`, by default a single one with `playouts.playout`
+            pool: Worker processes to run the playouts in, one per process at a time, while the tree
+                stays in this process (tree parallelization)
+            root: The node of the position from an earlier search to grow further, see
+                `MonteCarloPlayer.reuse_tree`
+        '''
+        self.game = game if isinstance(game, Board) else Board.from_game(game)
         self.max_time = max_time
         self.max_plies = max_plies
+        self.rollouts = rollouts
+        self.pool = pool
         self.player = 0 if self.game.turn == Player.BLACK else 1
         self.not_player = 1 if self.game.turn == Player.BLACK else 0
         self.counter = 0
-        self.root = MctsNode(self.game, None)
+        self.sim_count = 0
+        self.simulations_per_second = 0
+        self.root = root if root is not None else MctsNode(self.game, None)
 
     def initialize(self):
         for move in self.root.moves:
-            child = MctsNode(move.next_state, self.root, *move.move)
+            child = MctsNode(self.root.next_state(move.move), self.root, *move.move)
             self.root.append_child(child)
             self.root.moves.pop()
 
     def run(self) -> Tuple[Union[Space, Tuple[Space, Space]], Direction]:
-        child_count = 0
-        sim_count = 0
+        self.simulate()
+        print(f'child_count: {self.counter} sim_count: {self.sim_count} sims/s: {self.simulations_per_second:.0f}')
+        # self.root.print()
+        return self.choose_best(self.root)
+
+    def simulate(self):
+        '''
+        Grows the tree until `max_time` is up
+        '''
         start_time = time.time()
 
         # inititalize tree
         self.initialize()
 
         # exhaust time resources
-        while time.time() - start_time < self.max_time:
-            leaf = self.traverse(self.root)
-            simulation_result = self.playout(leaf)
-            self.backpropagate(leaf, simulation_result)
-            child_count += 1
-            sim_count += 1
-        print(f'child_count: {self.counter} sim_count: {sim_count}')
-        # self.root.print()
-        return self.choose_best(self.root)
+        if self.pool is None:
+            while time.time() - start_time < self.max_time:
+                leaf = self.traverse(self.root)
+                simulation_result = self.playout(leaf)
+                self.backpropagate(leaf, simulation_result)
+                self.sim_count += self.rollouts or 1
+        else:
+            self.simulate_parallel(start_time)
+        self.simulations_per_second = self.sim_count / (time.time() - start_time)
+
+    def simulate_parallel(self, start_time: float):
+        '''
+        Keeps a playout running in every worker process. The leaf of a playout gets a virtual loss until
+        its result is backpropagated.
+        '''
+        running = deque()
+        while True:
+            while time.time() - start_time < self.max_time and len(running) < self.pool.processes:
+                leaf = self.traverse(self.root)
+                self.add_virtual_loss(leaf, self.VIRTUAL_LOSS)
+                running.append((leaf, self.pool.apply_async(
+                    mcts_playout, (leaf.game.pack(), self.max_plies, self.rollouts))))
+            if not running:
+                break
+            leaf, result = running.popleft()
+            self.add_virtual_loss(leaf, -self.VIRTUAL_LOSS)
+            self.backpropagate(leaf, self.result(result.get()))
+            self.sim_count += self.rollouts or 1
+
+    def add_virtual_loss(self, node: MctsNode, games: int):
+        while (node != None):
+            node.no_games += games
+            if node.no_games:
+                node.update_uct()
+            else:
+                node.uct = float('inf')
+            node = node.parent
+
+    def merge(self, children: List[Tuple[Tuple[Union[Space, Tuple[Space, Space]], Direction], int, int, int]]):
+        '''
+        Adds the statistics of the root children of another search of the same position, as
+        `(move, no_games, black_stats, white_stats)`
+        '''
+        nodes = {(child.marbles, child.direction): child for child in self.root.children}
+        for move, no_games, black_stats, white_stats in children:
+            if move not in nodes:
+                nodes[move] = MctsNode(self.root.next_state(move), self.root, *move)
+                self.root.append_child(nodes[move])
+            nodes[move].no_games += no_games
+            nodes[move].black_stats += black_stats
+            nodes[move].white_stats += white_stats
+            self.root.no_games += no_games
 
     def choose_best(self, root: MctsNode) -> Tuple[Union[Space, Tuple[Space, Space]], Direction]:
         best = None
@@ -518,12 +1441,9 @@ class MonteCarloSearch(Algorithm):
 
     def backpropagate(self, node: MctsNode, result: Tuple[int, int]):
         while (node != None):
-            node.update_stats(result)
+            node.update_stats(result, self.rollouts or 1)
             node = node.parent
 
-    def playout_policy(self, state: game):
-        return state.generate_random_move()
-
     # function for node traversal
     def traverse(self, node):
         while (True):
@@ -535,9 +1455,8 @@ class MonteCarloSearch(Algorithm):
                 self.counter = 0
         return node
 
-    def utility(self, state: Game):
+    def utility(self, new_score: Tuple[int, int]):
         old_score = self.game.get_score()
-        new_score = state.get_score()
         marbles_lost = old_score[self.player] - new_score[self.player]
         marbles_won = old_score[self.not_player] - new_score[self.not_player]
         if marbles_won > marbles_lost:
@@ -547,15 +1466,67 @@ class MonteCarloSearch(Algorithm):
         else:
             return (0, 0)
 
+    def batch_utility(self, new_scores: np.ndarray) -> Tuple[int, int]:
+        '''
+        Sum of `utility` over the scores of `playouts.batch_playout`
+        '''
+        old_score = self.game.get_score()
+        marbles_lost = old_score[self.player] - new_scores[:, self.player]
+        marbles_won = old_score[self.not_player] - new_scores[:, self.not_player]
+        return int((marbles_won > marbles_lost).sum()), int((marbles_won < marbles_lost).sum())
+
+    def result(self, scores: Union[Tuple[int, int], np.ndarray]) -> Tuple[int, int]:
+        '''
+        `utility` of the scores of `mcts_playout`
+        '''
+        if self.rollouts is None:
+            return self.utility(scores)
+        return self.batch_utility(scores)
+
     def playout(self, node: MctsNode):
-        plies = 0
-        state = copy.deepcopy(node.game)
-        while (plies < self.max_plies and not utils.game_is_over(state.get_score())):
-            move = self.playout_policy(state)
-            state.move(*move)
-            state.switch_player()
-            plies += 1
-        return self.utility(state)
+        '''
+        Plays uniformly random moves from the position of `node`, see `playouts.playout`, or `rollouts`
+        games at once
+        '''
+        return self.result(mcts_playout(node.game.pack(), self.max_plies, self.rollouts))
+
+
+def mcts_playout(position: Tuple[int, int, int], max_plies: int, rollouts: int = None) -> Union[Tuple[int, int], np.ndarray]:
+    '''
+    Final scores of the playouts of `MonteCarloSearch` from a packed position, in this or a worker process
+    '''
+    black, white, turn = position
+    if rollouts is None:
+        return playouts.playout(black, white, Player(turn), max_plies)
+    return playouts.batch_playout(black, white, Player(turn), max_plies, rollouts)
+
+
+def use_new_random_state():
+    '''
+    Initializes a worker process of `MonteCarloPlayer`, which may have been forked with the random state
+    of this process and would play the same playouts as the other workers
+    '''
+    random.seed()
+
+
+def mcts_search(algorithm: type, position: Tuple[int, int, int], deadline: float, max_plies: int, rollouts: int = None) -> Tuple[list, int, Tuple[int, dict]]:
+    '''
+    Independent search of a worker process of `MonteCarloPlayer` with root parallelization until the
+    deadline
+
+    Returns:
+        The statistics of the root children as `MonteCarloSearch.merge` takes them, the number of
+        simulations and the process id together with the simulation statistics
+    '''
+    search = algorithm(Board.unpack(position), max_time=deadline - time.time(),
+                       max_plies=max_plies, rollouts=rollouts)
+    search.simulate()
+    children = [((child.marbles, child.direction), child.no_games, child.black_stats, child.white_stats)
+                for child in search.root.children]
+    return children, search.sim_count, (os.getpid(), {
+        'simulations': search.sim_count,
+        'simulations_per_second': search.simulations_per_second,
+    })
 
 
 class MonteCarloSearchImproved(MonteCarloSearch):
@@ -577,12 +1548,15 @@ class MonteCarloSearchImproved(MonteCarloSearch):
         return best
 
     def initialize(self):
-        self.expand(self.root, breadth=20)
+        # a reused root keeps its children and gets new ones up to the breadth of a new root
+        breadth = min(20 - len(self.root.children), len(self.root.moves))
+        if breadth > 0:
+            self.expand(self.root, breadth=breadth)
 
     def expand(self, node, breadth=1):
         for _ in range(breadth):
             move = node.moves.pop()
-            new_node = MctsNode(move.next_state, node, *move.move)
+            new_node = MctsNode(node.next_state(move.move), node, *move.move)
             node.append_child(new_node)
         return new_node
 
@@ -593,20 +1567,111 @@ class MonteCarloSearchImproved(MonteCarloSearch):
 
 
 class MonteCarloPlayer(AbstractPlayer):
-    def __init__(self, *args, max_time=20, verbose=True, **kwargs):
+    '''
+    With more than one worker, the search runs in parallel, in one of two ways:
+
+    - root parallelization: `workers - 1` worker processes grow independent trees of the position
+      next to the search in this process, and the statistics of the root children are summed up
+      before the move is chosen
+    - tree parallelization: there is one tree in this process, and the playouts run in `workers`
+      worker processes, see `MonteCarloSearch.simulate_parallel`
+
+    The worker processes live until `close` is called.
+
+    The tree is kept from one turn to the next, the search of the next turn starts with the subtree of
+    the position that the game went into, see `reuse_tree`.
+    '''
+    PARALLELIZATIONS = ('root', 'tree')
+
+    def __init__(self, *args, max_time=20, rollouts: int = None, workers: int = 1, parallelization: str = 'root', verbose=True, **kwargs):
         super().__init__(*args, **kwargs)
+        if parallelization not in self.PARALLELIZATIONS:
+            raise ValueError(f'Unknown parallelization {parallelization}')
         self.max_time = max_time
+        self.rollouts = rollouts
+        self.workers = workers or cpu_count()
+        self.parallelization = parallelization
+        self.verbose = verbose
+        self.pool = None
+        self.tree = None
+        self.reused_games = 0
+        self.simulations_per_second = 0
 
     def __str__(self):
-        return f'MonteCarlo player max_time: {self.max_time} algo: {str(self.get_algorithm())}'
+        return f'MonteCarlo player max_time: {self.max_time} algo: {str(self.get_algorithm())} workers: {self.workers}'
 
     def get_algorithm(self):
         return MonteCarloSearch
 
     def turn(self, game: Game, moves_history: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]]) -> Tuple[Union[Space, Tuple[Space, Space]], Direction]:
-        result = self.get_algorithm()(game, max_time=self.max_time).run()
+        if self.workers > 1 and self.pool is None:
+            processes = self.workers - 1 if self.parallelization == 'root' else self.workers
+            self.pool = WorkerPool(processes, use_new_random_state)
+        root = self.reuse_tree(game, moves_history)
+        self.reused_games = root.no_games if root is not None else 0
+        if self.pool is not None and self.parallelization == 'root':
+            search = self.root_parallel(game, root)
+            result = search.choose_best(search.root)
+        else:
+            search = self.get_algorithm()(game, max_time=self.max_time,
+                                          rollouts=self.rollouts, pool=self.pool, root=root)
+            result = search.run()
+        self.simulations_per_second = search.simulations_per_second
+        self.tree = search.root
+        if self.verbose:
+            print(f'reused games: {self.reused_games}')
         return result
 
+    def reuse_tree(self, game: Game, moves_history: List[Tuple[Union[Space, Tuple[Space, Space]], Direction]]) -> Union[MctsNode, None]:
+        '''
+        The node of the tree of the last turn that the last two moves, our own and the one of the
+        opponent, lead to. It becomes the root, so the rest of the tree can be freed.
+
+        The playouts of a search are judged by the marbles won and lost since its root, see
+        `MonteCarloSearch.utility`. If a marble was pushed off in the last two moves, the statistics of
+        the node mean something else than the ones of a search from it and the node is not reused.
+
+        Returns:
+            The node or `None` if it is not in the tree or a marble was pushed off
+        '''
+        tree, self.tree = self.tree, None
+        if tree is None or len(moves_history) < 2:
+            return None
+        node = tree
+        for marbles, direction in moves_history[-2:]:
+            marbles = tuple(marbles) if isinstance(marbles, list) else marbles
+            node = next((child for child in node.children
+                         if child.marbles == marbles and child.direction == direction), None)
+            if node is None:
+                return None
+        if node.game != Board.from_game(game) or node.game.get_score() != tree.game.get_score():
+            return None
+        node.parent = None
+        return node
+
+    def root_parallel(self, game: Game, root: MctsNode = None) -> MonteCarloSearch:
+        start = time.time()
+        algorithm = self.get_algorithm()
+        search = algorithm(game, max_time=self.max_time, rollouts=self.rollouts, root=root)
+        position = search.game.pack()
+        helpers = self.pool.map_async(mcts_search, [(algorithm, position, start + self.max_time, search.max_plies, self.rollouts)
+                                                    for _ in range(self.workers - 1)])
+        search.simulate()
+        sim_count = search.sim_count
+        for children, count, (pid, stats) in helpers.get():
+            search.merge(children)
+            sim_count += count
+            self.pool.stats[pid] = stats
+        search.simulations_per_second = sim_count / (time.time() - start)
+        if self.verbose:
+            print(f'sim_count: {sim_count} sims/s: {search.simulations_per_second:.0f} workers: {self.workers}')
+        return search
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
 
 class MonteCarloPlayerImproved(MonteCarloPlayer):
     def get_algorithm(self):
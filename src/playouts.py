@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""This module contains the random playouts of the Monte Carlo players, one by one on bitboards or many at once on arrays"""
+import random
+from typing import List, Tuple, Union
+
+import numpy as np
+from abalone.enums import Direction, Player, Space
+
+from . import utils
+from .board import BITS, INLINE_MOVES, LINES, SPACES, Board, iterate_cells, popcount
+
+
+def _candidates() -> List[List[Tuple[int, int, Union[List[int], None], tuple]]]:
+    '''
+    Every move that a marble on each cell could start, whether it is legal or not, as
+    `(mask, destinations, ray, move)`. For an inline move `mask` is the bit of the marble and `ray` its
+    entry in `board.RAYS`, for a broadside move `mask` are the bits of the line, `destinations` the bits
+    it moves to and `ray` is `None`. Every legal move of a position is the candidate of exactly one own
+    marble.
+    '''
+    candidates = []
+    for cell in range(len(SPACES)):
+        candidates.append([(BITS[cell], 0, ray, (SPACES[cell], direction))
+                           for direction, ray in INLINE_MOVES[cell]])
+        for _, pair, _, triple in LINES[cell]:
+            for line in (pair, triple):
+                if line is None:
+                    continue
+                marbles, mask, broadsides = line
+                candidates[-1].extend((mask, destinations, None, (marbles, direction))
+                                      for direction, destinations in broadsides)
+    return candidates
+
+
+CANDIDATES = _candidates()
+SLOTS = max(len(candidates) for candidates in CANDIDATES)
+# draws after which `random_successor` gives up on rejection sampling and lists all moves
+MAX_REJECTIONS = 1000
+
+
+def random_successor(own: int, opponent: int, turn: Player) -> Tuple[Tuple[Union[Space, Tuple[Space, Space]], Direction], int, int]:
+    '''
+    Random legal move of the player in turn with the bitboards after it, like a move of
+    `board.Board.generate_successors`, without generating all moves. A slot in the candidates of an own
+    marble is drawn until it holds a legal move. As every legal move has exactly one slot, each one
+    is as likely as with `board.Board.generate_random_move`.
+    '''
+    cells = list(iterate_cells(own))
+    count = len(cells) * SLOTS
+    occupied = own | opponent
+    for _ in range(MAX_REJECTIONS):
+        index = int(random.random() * count)
+        candidates = CANDIDATES[cells[index // SLOTS]]
+        slot = index % SLOTS
+        if slot >= len(candidates):
+            continue
+        mask, destinations, ray, move = candidates[slot]
+        if ray is None:
+            if own & mask == mask and not occupied & destinations:
+                return move, own ^ mask ^ destinations, opponent
+        else:
+            result = Board._inline(own, opponent, mask, ray)
+            if result is not None:
+                return move, result[0], result[1]
+    # a choice among all moves is just as uniform
+    board = Board(own, opponent) if turn is Player.BLACK else Board(
+        opponent, own, Player.WHITE)
+    return random.choice(list(board.generate_successors()))
+
+
+def playout(black: int, white: int, turn: Player, max_plies: int) -> Tuple[int, int]:
+    '''
+    Plays random moves from the position with the bitboards `black` and `white` until the game is over
+    or `max_plies` moves are made
+
+    Returns:
+        The score of the final position as `board.Board.get_score` would return it
+    '''
+    own, opponent = (black, white) if turn is Player.BLACK else (white, black)
+    score = popcount(own), popcount(opponent)
+    plies = 0
+    while plies < max_plies and not utils.game_is_over(score):
+        _, own, opponent = random_successor(own, opponent, turn)
+        own, opponent = opponent, own
+        turn = Player.WHITE if turn is Player.BLACK else Player.BLACK
+        # only the player that moved can have taken a marble
+        score = popcount(own), score[0]
+        plies += 1
+    return score if turn is Player.BLACK else (score[1], score[0])
+
+
+# values of the board arrays of `batch_playout`, which have an extra column for the cells off the board
+EMPTY, BLACK, WHITE, OFF_BOARD = 0, 1, 2, 3
+CELL_COUNT = len(SPACES)
+# cells of a candidate in the board arrays: the marble and the five cells after it for an inline move,
+# the cells of the line and the ones it moves to for a broadside move
+CANDIDATE_CELLS = 6
+PATTERNS = 4 ** CANDIDATE_CELLS
+INLINE, PAIR, TRIPLE, NO_CANDIDATE = range(4)
+# marbles drawn at once for every game that has not found its move yet
+DRAWS = 8
+
+
+def _candidate_table() -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    `CANDIDATES` as arrays indexed by `cell * SLOTS + slot`: the offset `kind * PATTERNS` of the pattern
+    indices of every candidate and its cells, padded with the off board column
+    '''
+    kinds = np.full((CELL_COUNT, SLOTS), NO_CANDIDATE, dtype=np.int64)
+    cells = np.full((CELL_COUNT, SLOTS, CANDIDATE_CELLS), CELL_COUNT, dtype=np.int64)
+    for cell, candidates in enumerate(CANDIDATES):
+        for slot, (mask, destinations, ray, _) in enumerate(candidates):
+            if ray is not None:
+                kinds[cell, slot] = INLINE
+                line = [cell] + [bit.bit_length() - 1 for bit in ray[:CANDIDATE_CELLS - 1]]
+                cells[cell, slot, :len(line)] = line
+            else:
+                line = list(iterate_cells(mask))
+                kinds[cell, slot] = PAIR if len(line) == 2 else TRIPLE
+                cells[cell, slot, :len(line)] = line
+                cells[cell, slot, 3:3 + len(line)] = list(iterate_cells(destinations))
+    return kinds.reshape(-1) * PATTERNS, cells.reshape(-1, CANDIDATE_CELLS)
+
+
+def _result(kind: int, values: List[int], own: int, opponent: int) -> Union[Tuple[List[int], bool], None]:
+    '''
+    Values of the cells of a candidate of `kind` after the move and whether it pushes a marble off the
+    board, or `None` if the move is illegal. The same rules as `board.Board._inline` and
+    `board.Board._broadside`.
+    '''
+    result = list(values)
+    if kind == INLINE:
+        if values[0] != own:
+            return None
+        marbles = 1
+        while values[marbles] == own:
+            marbles += 1
+            if marbles > 3:
+                return None
+        pushed = 0
+        while values[marbles + pushed] == opponent:
+            pushed += 1
+            if pushed >= marbles:
+                return None
+        if values[marbles] == OFF_BOARD or values[marbles + pushed] == own:
+            return None
+        result[0] = EMPTY
+        for i in range(1, marbles + pushed + 1):
+            if values[i] != OFF_BOARD:
+                result[i] = values[i - 1]
+        return result, values[marbles + pushed] == OFF_BOARD and pushed > 0
+    if kind in (PAIR, TRIPLE):
+        length = 2 if kind == PAIR else 3
+        if any(value != own for value in values[:length]) or any(
+                value != EMPTY for value in values[3:3 + length]):
+            return None
+        result[:length] = [EMPTY] * length
+        result[3:3 + length] = [own] * length
+        return result, False
+    return None
+
+
+def _pattern_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Legality, captures and resulting cell values of every candidate kind and every pattern of cell
+    values, indexed by the player in turn and `kind * PATTERNS + pattern`, where the value of the i-th
+    cell counts `4 ** i` in the pattern
+    '''
+    legal = np.zeros((2, 4 * PATTERNS), dtype=bool)
+    captures = np.zeros((2, 4 * PATTERNS), dtype=np.int8)
+    results = np.zeros((2, 4 * PATTERNS, CANDIDATE_CELLS), dtype=np.int8)
+    for turn, (own, opponent) in enumerate(((BLACK, WHITE), (WHITE, BLACK))):
+        for pattern in range(PATTERNS):
+            values = [(pattern >> (2 * i)) & 3 for i in range(CANDIDATE_CELLS)]
+            for kind in range(4):
+                index = kind * PATTERNS + pattern
+                result = _result(kind, values, own, opponent)
+                results[turn, index] = values
+                if result is not None:
+                    legal[turn, index] = True
+                    results[turn, index], captures[turn, index] = result
+    return legal, captures, results
+
+
+CANDIDATE_OFFSETS, CANDIDATE_TABLE = _candidate_table()
+LEGAL, CAPTURES, RESULTS = _pattern_tables()
+POWERS = 4 ** np.arange(CANDIDATE_CELLS)
+
+
+def _patterns(cells: np.ndarray, rows: np.ndarray, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Indices of the cells in the flattened board arrays and pattern indices of the `candidates`, given as
+    `cell * SLOTS + slot`, in the games `rows`, which are broadcast against them
+    '''
+    indices = (rows * (CELL_COUNT + 1))[..., np.newaxis] + CANDIDATE_TABLE.take(candidates, axis=0)
+    return indices, CANDIDATE_OFFSETS.take(candidates) + cells.take(indices) @ POWERS
+
+
+def _move(cells: np.ndarray, rows: np.ndarray, turn: int, generator: np.random.Generator) -> np.ndarray:
+    '''
+    Makes a random legal move in the games `rows` of the board arrays `cells`, where `turn` is 0 if
+    black is in turn. Like `random_successor`, slots of own marbles are drawn, `DRAWS` per game at
+    once, until one holds a legal move.
+
+    Returns:
+        Whether each game lost a marble of the opponent
+    '''
+    flat = cells.reshape(-1)
+    own = cells[rows, :CELL_COUNT] == (BLACK, WHITE)[turn]
+    counts = own.sum(axis=1)
+    # the own marbles of all games one after the other
+    _, own_cells = np.nonzero(own)
+    offsets = np.cumsum(counts) - counts
+    captured = np.zeros(len(rows), dtype=bool)
+    pending = np.arange(len(rows))
+    for _ in range(MAX_REJECTIONS // DRAWS):
+        if not len(pending):
+            return captured
+        draws = (generator.random((len(pending), DRAWS)) *
+                 (counts[pending] * SLOTS)[:, np.newaxis]).astype(np.int64)
+        candidates = own_cells.take(offsets[pending, np.newaxis] + draws // SLOTS) * SLOTS + draws % SLOTS
+        indices, patterns = _patterns(cells, rows[pending, np.newaxis], candidates)
+        legal = LEGAL[turn].take(patterns)
+        found = legal.any(axis=1)
+        # the first legal draw of every game
+        first = legal.argmax(axis=1)[found]
+        games = pending[found]
+        patterns = patterns[found, first]
+        flat[indices[found, first]] = RESULTS[turn].take(patterns, axis=0)
+        captured[games] = CAPTURES[turn].take(patterns)
+        pending = pending[~found]
+    for game in pending:
+        # a choice among all candidates is just as uniform
+        marbles = own_cells[offsets[game]:offsets[game] + counts[game]]
+        candidates = (marbles[:, np.newaxis] * SLOTS + np.arange(SLOTS)).reshape(-1)
+        indices, patterns = _patterns(cells, rows[game], candidates)
+        choice = generator.choice(np.flatnonzero(LEGAL[turn].take(patterns)))
+        flat[indices[choice]] = RESULTS[turn, patterns[choice]]
+        captured[game] = CAPTURES[turn, patterns[choice]]
+    return captured
+
+
+def batch_playout(black: int, white: int, turn: Player, max_plies: int, games: int, generator: np.random.Generator = None) -> np.ndarray:
+    '''
+    Plays `games` random games from the position with the bitboards `black` and `white` at the same
+    time, move by move on board arrays of shape (`games`, 62), until each one is over or `max_plies`
+    moves are made. The moves are just as random as those of `playout`.
+
+    Args:
+        generator: The random generator, by default one seeded from `random`
+
+    Returns:
+        The score of the final position of every game, an array of shape (`games`, 2)
+    '''
+    if generator is None:
+        generator = np.random.default_rng(random.getrandbits(64))
+    cells = np.full(CELL_COUNT + 1, OFF_BOARD, dtype=np.int8)
+    cells[:CELL_COUNT] = EMPTY
+    cells[list(iterate_cells(black))] = BLACK
+    cells[list(iterate_cells(white))] = WHITE
+    cells = np.tile(cells, (games, 1))
+    scores = np.tile(np.array([popcount(black), popcount(white)]), (games, 1))
+    turn = 0 if turn is Player.BLACK else 1
+    rows = np.arange(games)
+    plies = 0
+    while plies < max_plies:
+        rows = rows[(scores[rows] != 8).all(axis=1)]
+        if not len(rows):
+            break
+        captured = _move(cells, rows, turn, generator)
+        scores[rows, 1 - turn] -= captured
+        turn = 1 - turn
+        plies += 1
+    return scores
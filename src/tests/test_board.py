@@ -0,0 +1,113 @@
+import copy
+import random
+
+from abalone.enums import Direction, InitialPosition, Marble, Player, Space
+from abalone.game import Game
+
+from ..board import Board
+from ..experiments.perft import perft
+
+
+def _random_games(plies: int = 60):
+    rnd = random.Random(0)
+    for position in (InitialPosition.DEFAULT, InitialPosition.GERMAN_DAISY):
+        game = Game(initial_position=position)
+        for _ in range(plies):
+            yield game
+            game.move(*rnd.choice(list(game.generate_legal_moves())))
+            game.switch_player()
+            if 8 in game.get_score():
+                break
+
+
+def test_conversion():
+    for game in _random_games():
+        board = Board.from_game(game)
+        assert board.get_score() == game.get_score()
+        assert board.turn is game.turn
+        assert board.to_game().board == game.board
+        assert Board.from_game(board.to_game()) == board
+
+
+def test_legal_moves():
+    for game in _random_games(30):
+        board = Board.from_game(game)
+        assert list(board.generate_legal_moves()) == list(
+            game.generate_legal_moves())
+        for move, child in board.generate_children():
+            expected = copy.deepcopy(game)
+            expected.move(*move)
+            expected.switch_player()
+            assert child == Board.from_game(expected)
+
+            moved = board.copy()
+            moved.move(*move)
+            moved.switch_player()
+            assert moved == child
+
+            original = board.copy()
+            undo = board.make(*move)
+            assert board == child
+            board.unmake(undo)
+            assert board == original
+
+
+def test_pushes():
+    pushes = 0
+    for game in _random_games(30):
+        board = Board.from_game(game)
+        opponent = board.white if board.turn is Player.BLACK else board.black
+        expected = [successor for successor in board.generate_successors()
+                    if successor[2] != opponent]
+        assert sorted(board.generate_pushes(), key=str) == sorted(expected, key=str)
+        pushes += len(expected)
+    assert pushes > 0
+
+
+def test_incremental_key():
+    Board.debug = True
+    try:
+        for game in _random_games():
+            board = Board.from_game(game)
+            for move, child in board.generate_children():
+                undo = board.make(*move)
+                assert board.key == child.key
+                assert (board.adjacency, board.distance) == (
+                    child.adjacency, child.distance)
+                board.unmake(undo)
+    finally:
+        Board.debug = False
+
+
+def test_make_unmake_push_off():
+    game = Game()
+    game.board = [[Marble.BLANK] * len(row) for row in game.board]
+    for space in (Space.E2, Space.E3, Space.E4):
+        game.set_marble(space, Marble.BLACK)
+    game.set_marble(Space.E1, Marble.WHITE)
+    board = Board.from_game(game)
+    original = board.copy()
+
+    undo = board.make(Space.E4, Direction.WEST)
+    assert board.get_score() == (3, 0)
+    assert board.get_marble(Space.E1) is Marble.BLACK
+    assert board.get_marble(Space.E4) is Marble.BLANK
+
+    board.unmake(undo)
+    assert board == original
+    assert board.key == original.key
+    assert (board.adjacency, board.distance) == (
+        original.adjacency, original.distance)
+    assert board.get_score() == (3, 1)
+
+
+def test_perft():
+    for position in (InitialPosition.DEFAULT, InitialPosition.GERMAN_DAISY):
+        game = Game(initial_position=position)
+        expected = 0
+        for move in game.generate_legal_moves():
+            child = copy.deepcopy(game)
+            child.move(*move)
+            child.switch_player()
+            expected += len(list(child.generate_legal_moves()))
+        assert perft(Board.from_game(game), 2) == expected
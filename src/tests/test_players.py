@@ -1,9 +1,12 @@
+from types import SimpleNamespace
 from typing import List
 
-from abalone.enums import InitialPosition, Marble, Player
+from abalone.enums import Direction, InitialPosition, Marble, Player, Space
 from abalone.game import Game
 
-from .. import players
+from .. import players, utils
+from ..board import MOVE_CODES, Board
+from ..workers import WorkerPool
 
 BOARD_DIMENSIONS = [
     5, 6, 7, 8, 9, 8, 7, 6, 5
@@ -86,3 +89,430 @@ def test_heuristic():
         assert counts['sum_adjacency'][Player.WHITE.value] == board['expected_adjacency_white']
         assert counts['sum_distance'][Player.BLACK.value] == board['expected_distance_black']
         assert counts['sum_distance'][Player.WHITE.value] == board['expected_distance_white']
+
+
+def test_batch_heuristic():
+    for position in (InitialPosition.DEFAULT, InitialPosition.GERMAN_DAISY):
+        game = Game(initial_position=position)
+        for player in (Player.BLACK, Player.WHITE):
+            algorithm = players.AlphaBetaSimple(game, player.value)
+            moves, children = zip(*algorithm.game.generate_children())
+            evaluations = algorithm._evaluate_moves(children, moves)
+            for child, evaluation in zip(children, evaluations):
+                counts = algorithm._count_heuristics(child)
+                own, opp = player.value, -player.value
+                score = dict(zip((Player.BLACK.value, Player.WHITE.value), child.get_score()))
+                expected = (counts['sum_adjacency'][own] - counts['sum_adjacency'][opp]) - 1.5 * (
+                    counts['sum_distance'][own] - counts['sum_distance'][opp]) + 100 * (score[own] - score[opp])
+                assert evaluation == expected
+
+
+def test_transposition_table(monkeypatch):
+    for position in (InitialPosition.DEFAULT, InitialPosition.GERMAN_DAISY):
+        game = Game(initial_position=position)
+        expected = players.AlphaBetaSimple(
+            game, game.turn.value, depth=2, initial_depth=2).run()
+
+        monkeypatch.setattr(players, 'storage', utils.Storage())
+        result = players.AlphaBetaAdvanced(
+            game, game.turn.value, depth=2, initial_depth=2).run()
+        assert result == expected
+
+        # the root is stored as an exact entry and ends the second search immediately
+        nodes = []
+        players.storage.new_generation()
+        result = players.AlphaBetaAdvanced(
+            game, game.turn.value, depth=2, initial_depth=2, func=lambda: nodes.append(1)).run()
+        assert result == expected
+        assert len(nodes) == 1
+
+
+def test_single_search_object(monkeypatch):
+    game = _contact_position()
+    created = []
+    visited = []
+
+    class Algorithm(players.AlphaBetaReduced):
+        def __init__(self, *args, **kwargs):
+            created.append(self)
+            super().__init__(*args, **kwargs)
+
+        def post_hook(self, value, depth, alpha, beta):
+            visited.append((self.ply, depth))
+            super().post_hook(value, depth, alpha, beta)
+
+    monkeypatch.setattr(players, 'storage', utils.Storage())
+    algorithm = Algorithm(game, game.turn.value, depth=4, initial_depth=4)
+    result = algorithm.run()
+    assert len(created) == 1
+    assert algorithm.ply == 0
+    assert {depth for _, depth in visited} >= {1, 2, 3, 4}
+    assert max(ply for ply, _ in visited) >= 3
+    assert algorithm.variation[0] == (result[1], result[2])
+
+
+def test_history_ordering(monkeypatch):
+    monkeypatch.setattr(players, 'history', utils.MoveHistory())
+    for position in (InitialPosition.DEFAULT, InitialPosition.GERMAN_DAISY):
+        game = Game(initial_position=position)
+        expected = players.AlphaBetaSimple(
+            game, game.turn.value, depth=3, initial_depth=3).run()
+        monkeypatch.setattr(players, 'storage', utils.Storage())
+        result = players.AlphaBetaHistory(
+            game, game.turn.value, depth=3, initial_depth=3).run()
+        assert result[0] == expected[0]
+    assert any(players.history.history)
+
+
+def _contact_position() -> Game:
+    '''
+    Position where both players can push marbles
+    '''
+    game = Game(initial_position=InitialPosition.GERMAN_DAISY)
+    for _ in range(4):
+        game.move(*players.AlphaBetaSimple(game, game.turn.value, depth=1, initial_depth=1).run()[1:])
+        game.switch_player()
+    return game
+
+
+def test_staged_ordering(monkeypatch):
+    monkeypatch.setattr(players, 'history', utils.MoveHistory())
+    game = _contact_position()
+    algorithm = players.AlphaBetaAdvanced(game, game.turn.value, depth=2, initial_depth=2)
+    legal = list(algorithm.game.generate_legal_moves())
+    children = list(algorithm._create_children(2, True, hash_move=legal[-1]))
+    moves = [(child[0], child[1]) for child in children]
+    assert sorted(moves, key=legal.index) == legal
+    assert moves[0] == legal[-1]
+
+    # the moves that push opponent marbles come right after the hash move
+    board = algorithm.game
+    opponent = board.white if board.turn is Player.BLACK else board.black
+    pushes = {move for move, _, opponent_after in board.generate_successors()
+              if opponent_after != opponent and move != legal[-1]}
+    assert pushes
+    assert set(moves[1:len(pushes) + 1]) == pushes
+
+    # the evaluations are only computed at the frontier, where they are the values of the leaves
+    algorithm = players.AlphaBetaAdvanced(game, game.turn.value, depth=1, initial_depth=1)
+    expected = dict(((move[0], move[1]), algorithm._heuristic(child))
+                    for move, child in algorithm.game.generate_children())
+    assert {(child[0], child[1]): child[2] for child in algorithm._create_children(1, True)} == expected
+
+    algorithm = players.AlphaBetaAdvancedFast(game, game.turn.value, depth=2, initial_depth=2)
+    assert len(list(algorithm._create_children(2, True))) == 30
+
+
+def test_quiescence(monkeypatch):
+    game = _contact_position()
+    algorithm = players.AlphaBetaQuiescence(game, game.turn.value, depth=0, initial_depth=0)
+
+    def minimax(is_maximizer, depth):
+        # every node may stand pat or push
+        board = algorithm.game
+        values = [algorithm._heuristic(board)]
+        if depth > 0 and abs(values[0]) < 100000:
+            for move, _, _ in list(board.generate_pushes()):
+                undo = board.make(*move)
+                values.append(minimax(not is_maximizer, depth - 1))
+                board.unmake(undo)
+        return max(values) if is_maximizer else min(values)
+
+    for depth in range(4):
+        expected = minimax(True, depth)
+        assert algorithm._quiescence(float('-inf'), float('inf'), True, depth) == expected
+    assert expected != algorithm._heuristic(algorithm.game)
+
+    monkeypatch.setattr(players, 'storage', utils.Storage())
+    result = players.AlphaBetaQuiescence(game, game.turn.value, depth=2, initial_depth=2).run()
+    assert (result[1], result[2]) in list(game.generate_legal_moves())
+
+
+def test_reductions(monkeypatch):
+    game = _contact_position()
+    counts = {}
+    for switch in (None, 'late_move_reductions', 'null_move_pruning', 'futility_pruning'):
+        algorithm = type('Algorithm', (players.AlphaBetaAdvanced,),
+                         {switch: True} if switch else {})
+        monkeypatch.setattr(players, 'storage', utils.Storage())
+        monkeypatch.setattr(players, 'history', utils.MoveHistory())
+        monkeypatch.setattr(players, 'nodes', 0)
+        result = algorithm(game, game.turn.value, depth=4, initial_depth=4,
+                           func=players.count_nodes).run()
+        assert (result[1], result[2]) in list(game.generate_legal_moves())
+        counts[switch] = players.nodes
+    assert all(count < counts[None] for switch, count in counts.items() if switch)
+
+
+def test_null_move_hash_move(monkeypatch):
+    game = _contact_position()
+    cutoffs = []
+
+    class Algorithm(players.AlphaBetaAdvanced):
+        null_move_pruning = True
+
+        def _null_move(self, depth, alpha, beta, is_maximizer):
+            result = super()._null_move(depth, alpha, beta, is_maximizer)
+            if result is not None:
+                cutoffs.append(result)
+            return result
+
+        def post_hook(self, value, depth, alpha, beta):
+            # the stored move is one of the node, not the move that led to it
+            assert value[1] is None or (value[1], value[2]) in list(self.game.generate_legal_moves())
+            super().post_hook(value, depth, alpha, beta)
+
+    monkeypatch.setattr(players, 'storage', utils.Storage())
+    monkeypatch.setattr(players, 'history', utils.MoveHistory())
+    Algorithm(game, game.turn.value, depth=4, initial_depth=4).run()
+    assert cutoffs
+
+
+def test_reduced_killers(monkeypatch):
+    class CountingBoard(Board):
+        '''
+        Counts the moves that are made on it, which is the ply of the current node of a search
+        '''
+        plies = 0
+
+        def make(self, marbles, direction):
+            self.plies += 1
+            return super().make(marbles, direction)
+
+        def unmake(self, undo):
+            self.plies -= 1
+            super().unmake(undo)
+
+    reduced = []
+
+    class Algorithm(players.AlphaBetaAdvanced):
+        late_move_reductions = True
+
+        def _cutoff(self, child, depth):
+            super()._cutoff(child, depth)
+            # the killer is filed under the ply of the node, also if the node was searched shallower
+            assert self.ply == self.game.plies
+            assert players.history.killers[self.game.plies][0] == MOVE_CODES[(child[0], child[1])]
+            reduced.append(depth + self.game.plies < self.initial_depth)
+
+    monkeypatch.setattr(players, 'storage', utils.Storage())
+    monkeypatch.setattr(players, 'history', utils.MoveHistory())
+    game = CountingBoard.from_game(_contact_position())
+    Algorithm(game, game.turn.value, depth=5, initial_depth=5).run()
+    assert any(reduced)
+
+
+def test_iterative_deepening(monkeypatch):
+    # a clock that advances by a millisecond whenever the search reads it
+    readings = []
+
+    def clock():
+        readings.append(len(readings) * 0.001)
+        return readings[-1]
+    monkeypatch.setattr(players, 'time', SimpleNamespace(time=clock))
+
+    game = Game()
+    player = players.AlphaBetaPlayer(max_time=0.5, verbose=False)
+    result, depth = player.iterative_deepening(game)
+    # the search stops at the first reading after the deadline
+    deadline = readings[0] + 0.5
+    assert len([reading for reading in readings if reading > deadline]) == 1
+    assert 1 <= depth < player.MAX_DEPTH
+    assert (result[1], result[2]) in list(game.generate_legal_moves())
+
+
+def test_aspiration_windows():
+    game = Game(initial_position=InitialPosition.GERMAN_DAISY)
+    player = players.AlphaBetaPlayer(verbose=False)
+    player.ASPIRATION_WINDOW = None
+    expected, _ = player.search(game)
+    assert (player.root_searches, player.re_searches) == (1, 0)
+
+    for guess in (expected[0], expected[0] + 50, expected[0] - 50):
+        player = players.AlphaBetaPlayer(verbose=False)
+        player.score = guess
+        result, _ = player.search(game)
+        assert result[0] == expected[0]
+        assert player.re_searches == (0 if guess == expected[0] else 1)
+
+
+def test_pvs(monkeypatch):
+    pool = WorkerPool(2)
+    try:
+        for position in (InitialPosition.DEFAULT, InitialPosition.GERMAN_DAISY):
+            game = Game(initial_position=position)
+            expected = players.AlphaBetaSimple(
+                game, game.turn.value, depth=3, initial_depth=3).run()
+            for worker_pool in (None, pool):
+                monkeypatch.setattr(players, 'storage', utils.Storage())
+                result = players.PVS(
+                    game, game.turn.value, depth=3, initial_depth=3, pool=worker_pool).run()
+                assert result[0] == expected[0]
+
+        # only the root sends its younger brothers to the workers
+        game = _contact_position()
+        monkeypatch.setattr(players, 'storage', utils.Storage())
+        algorithm = players.PVS(game, game.turn.value, depth=4, initial_depth=4, pool=pool)
+        dispatches = []
+        search_younger_brothers = algorithm._search_younger_brothers
+
+        def dispatch(*args):
+            dispatches.append(algorithm.ply)
+            return search_younger_brothers(*args)
+        algorithm._search_younger_brothers = dispatch
+        result = algorithm.run()
+        assert (result[1], result[2]) in list(game.generate_legal_moves())
+        assert dispatches == [0]
+    finally:
+        pool.close()
+
+
+def test_closed_pvs_player():
+    game = Game()
+    player = players.PVSPlayerShallow(workers=2, verbose=False)
+    try:
+        player.turn(game, [])
+        assert players.storage is player.storage
+    finally:
+        player.close()
+    # the searches of this process go back to their own table
+    assert players.storage is players.default_storage
+    move = players.AlphaBetaPlayer(max_time=0.5, verbose=False).turn(game, [])
+    assert tuple(move) in list(game.generate_legal_moves())
+
+
+def test_closed_parallel_players():
+    game = Game()
+    for reverse in (False, True):
+        parallel = [players.PVSPlayerShallow(workers=2, verbose=False),
+                    players.LazySMPPlayer(workers=2, verbose=False)]
+        try:
+            for player in parallel:
+                player.turn(game, [])
+        finally:
+            for player in (reversed(parallel) if reverse else parallel):
+                player.close()
+        # no matter which player was closed last, its table is not left behind
+        assert players.storage is players.default_storage
+        move = players.AlphaBetaPlayer(max_time=0.5, verbose=False).turn(game, [])
+        assert tuple(move) in list(game.generate_legal_moves())
+
+
+def test_lazy_smp():
+    game = Game()
+    player = players.LazySMPPlayer(workers=2, verbose=False)
+    try:
+        move = player.turn(game, [])
+        assert tuple(move) in list(game.generate_legal_moves())
+        assert len(player.pool.stats) == 1
+    finally:
+        player.close()
+    assert player.pool is None
+    assert players.storage is players.default_storage
+    move = players.AlphaBetaPlayer(max_time=0.5, verbose=False).turn(game, [])
+    assert tuple(move) in list(game.generate_legal_moves())
+
+
+def test_lazy_mcts_node():
+    game = Board.from_game(_contact_position())
+    node = players.MctsNode(game, None)
+    assert node._moves is None
+
+    # the moves are in the order of the heuristic of the positions they lead to
+    expected = sorted(((move, players.Heuristics.evaluate_move(Player.BLACK.value, game, child, *move))
+                       for move, child in game.generate_children()),
+                      key=lambda x: x[1], reverse=game.turn is not Player.BLACK)
+    assert [(move.move, move.value) for move in node.moves] == expected
+
+    move = node.moves[-1]
+    state = node.next_state(move.move)
+    child = game.copy()
+    child.move(*move.move)
+    child.switch_player()
+    assert (state.black, state.white, state.turn) == (child.black, child.white, child.turn)
+
+
+def test_batch_rollouts():
+    game = _contact_position()
+    for algorithm in (players.MonteCarloSearch, players.MonteCarloSearchImproved):
+        search = algorithm(game, max_time=0.5, rollouts=16)
+        move = search.run()
+        assert move in list(game.generate_legal_moves())
+        # every simulation counts the games of all rollouts
+        assert search.root.no_games % 16 == 0
+        assert all(child.black_stats + child.white_stats <= child.no_games
+                   for child in search.root.children)
+
+
+def test_parallel_mcts():
+    game = Game()
+    for parallelization in players.MonteCarloPlayer.PARALLELIZATIONS:
+        player = players.MonteCarloPlayerImproved(
+            max_time=0.5, workers=2, parallelization=parallelization, verbose=False)
+        try:
+            move = player.turn(game, [])
+            assert tuple(move) in list(game.generate_legal_moves())
+            assert player.simulations_per_second > 0
+            assert len(player.pool.stats) == (1 if parallelization == 'root' else 0)
+        finally:
+            player.close()
+        assert player.pool is None
+
+    # the merged root children count the games of both searches
+    search = players.MonteCarloSearchImproved(game, max_time=0.2)
+    search.simulate()
+    children = [((child.marbles, child.direction), child.no_games, child.black_stats, child.white_stats)
+                for child in search.root.children]
+    games = search.root.no_games
+    search.merge(children + [(children[0][0], 1, 1, 0)])
+    assert search.root.no_games == 2 * games + 1
+    assert search.root.children[0].no_games == 2 * children[0][1] + 1
+
+
+def test_tree_reuse():
+    for reply_in_tree in (True, False):
+        game = Game()
+        player = players.MonteCarloPlayerImproved(max_time=0.5, verbose=False)
+        moves_history = []
+        move = player.turn(game, moves_history)
+        # with the replies in the tree, it is reused in the second and in the third turn
+        for _ in range(2 if reply_in_tree else 1):
+            game.move(*move)
+            game.switch_player()
+            node = next(child for child in player.tree.children
+                        if (child.marbles, child.direction) == tuple(move))
+            if reply_in_tree:
+                # the opponent plays the most visited reply
+                expected = max(node.children, key=lambda child: child.no_games)
+                reply = (expected.marbles, expected.direction)
+                games = expected.no_games
+            else:
+                known = {(child.marbles, child.direction) for child in node.children}
+                reply = next(legal for legal in game.generate_legal_moves() if legal not in known)
+            game.move(*reply)
+            game.switch_player()
+            moves_history += [move, reply]
+
+            move = player.turn(game, moves_history)
+            if reply_in_tree:
+                assert player.reused_games == games > 0
+                assert player.tree is expected and player.tree.parent is None
+                assert player.tree.no_games > games
+            else:
+                assert player.reused_games == 0
+            assert player.tree.game == Board.from_game(game)
+
+
+def test_no_tree_reuse_after_push_off():
+    board = Board.from_game(Game())
+    # the moves are not played, only their nodes are looked up
+    moves = [(Space.A1, Direction.NORTH_EAST), (Space.I5, Direction.SOUTH_WEST)]
+    white = board.white & ~(board.white & -board.white)
+    for after, reused in ((board, True), (Board(board.black, white), False)):
+        player = players.MonteCarloPlayer(verbose=False)
+        player.tree = players.MctsNode(board, None)
+        child = players.MctsNode(board, player.tree, *moves[0])
+        player.tree.append_child(child)
+        node = players.MctsNode(after, child, *moves[1])
+        child.append_child(node)
+        assert (player.reuse_tree(after.to_game(), moves) is node) == reused
@@ -0,0 +1,85 @@
+import random
+from collections import Counter
+
+import numpy as np
+from abalone.enums import Marble, Player
+
+from .. import playouts
+from ..board import SPACES, Board, popcount
+from .test_board import _random_games
+
+
+def test_random_successor():
+    random.seed(0)
+    for game in list(_random_games(30))[::10]:
+        board = Board.from_game(game)
+        own, opponent = board._own_and_opponent()
+        successors = {move: (own_after, opponent_after)
+                      for move, own_after, opponent_after in board.generate_successors()}
+        samples = 100 * len(successors)
+        counts = Counter()
+        for _ in range(samples):
+            move, own_after, opponent_after = playouts.random_successor(
+                own, opponent, board.turn)
+            assert successors[move] == (own_after, opponent_after)
+            counts[move] += 1
+        # every move is drawn and none far more often than the others
+        assert set(counts) == set(successors)
+        expected = samples / len(successors)
+        assert sum((count - expected) ** 2 / expected for count in counts.values()) < 2 * len(successors)
+
+
+def test_playout():
+    random.seed(0)
+    for game in list(_random_games(2)):
+        board = Board.from_game(game)
+        for max_plies in (0, 1, 200):
+            score = playouts.playout(board.black, board.white, board.turn, max_plies)
+            # marbles are only lost, one per move at most
+            assert score[0] <= board.get_score()[0] and score[1] <= board.get_score()[1]
+            assert sum(board.get_score()) - sum(score) <= max_plies
+            if max_plies == 0:
+                assert score == board.get_score()
+
+    # a game that is over is not played on
+    black = sum(1 << cell for cell in range(8))
+    white = sum(1 << cell for cell in range(50, 61))
+    assert playouts.playout(black, white, Player.BLACK, 200) == (8, 11)
+
+
+def test_batch_playout():
+    random.seed(0)
+    for game in list(_random_games(30))[::10]:
+        board = Board.from_game(game)
+        successors = set()
+        for _, own_after, opponent_after in board.generate_successors():
+            successors.add((own_after, opponent_after) if board.turn is Player.BLACK else (
+                opponent_after, own_after))
+        games = 50 * len(successors)
+        scores = playouts.batch_playout(board.black, board.white, board.turn, 1, games)
+
+        # the moves of a single ply are the same as the ones of `random_successor`
+        cells = np.tile(np.full(playouts.CELL_COUNT + 1, playouts.OFF_BOARD, dtype=np.int8), (games, 1))
+        values = {Marble.BLANK: playouts.EMPTY, Marble.BLACK: playouts.BLACK, Marble.WHITE: playouts.WHITE}
+        cells[:, :playouts.CELL_COUNT] = [[values[board.get_marble(space)] for space in SPACES]]
+        turn = 0 if board.turn is Player.BLACK else 1
+        captured = playouts._move(cells, np.arange(games), turn, np.random.default_rng(0))
+        counts = Counter()
+        for row, capture in zip(cells, captured):
+            black = sum(1 << int(cell) for cell in np.flatnonzero(row == playouts.BLACK))
+            white = sum(1 << int(cell) for cell in np.flatnonzero(row == playouts.WHITE))
+            assert (black, white) in successors
+            assert capture == (popcount(black) + popcount(white) < sum(board.get_score()))
+            counts[(black, white)] += 1
+        assert set(counts) == successors
+        expected = games / len(successors)
+        assert sum((count - expected) ** 2 / expected for count in counts.values()) < 2 * len(successors)
+        # at most the opponent loses a marble
+        black, white = board.get_score()
+        after_capture = (black, white - 1) if turn == 0 else (black - 1, white)
+        assert all(tuple(score) in ((black, white), after_capture) for score in scores)
+
+    # games that are over are not played on
+    black = sum(1 << cell for cell in range(8))
+    white = sum(1 << cell for cell in range(50, 61))
+    assert playouts.batch_playout(black, white, Player.BLACK, 200, 3).tolist() == [[8, 11]] * 3
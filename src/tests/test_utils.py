@@ -0,0 +1,73 @@
+import pickle
+import random
+
+from ..board import MOVES
+from ..utils import MoveHistory, SharedStorage, Storage
+
+
+def test_storage():
+    storage = Storage(max_memory=1024)
+    assert storage.memory == 1024
+    generator = random.Random(0)
+    moves = [move for move in MOVES if move is not None]
+    for i in range(200):
+        key = generator.getrandbits(64)
+        move = generator.choice(moves)
+        storage.set_tt_value(key, (i / 2, *move), 'lower', i % 5)
+        assert storage.get_tt_value(key, i % 5) == ('lower', (i / 2, *move))
+        assert storage.get_tt_value(key, 5) is None
+    assert storage.memory == 1024
+    assert storage.stats()['overwrites'] > 0
+
+
+def test_storage_replacement():
+    storage = Storage(max_memory=32)
+    assert storage.buckets == 1
+    storage.set_tt_value(1, (1.0, None, None), None, 4)
+    storage.set_tt_value(2, (2.0, None, None), None, 1)
+    storage.set_tt_value(3, (3.0, None, None), None, 2)
+    # the deep entry survives, the always replace slot holds the latest one
+    assert storage.get_tt_value(1, 4) is not None
+    assert storage.get_tt_value(2, 0) is None
+    assert storage.get_tt_value(3, 2) is not None
+
+    storage.new_generation()
+    storage.set_tt_value(4, (4.0, None, None), None, 1)
+    # entries of an older generation are replaced regardless of their depth
+    assert storage.get_tt_value(4, 1) is not None
+    assert storage.get_tt_value(1, 0) is not None
+    assert storage.get_tt_value(3, 0) is None
+
+
+def test_shared_storage():
+    storage = SharedStorage(max_memory=1024)
+    try:
+        attached = pickle.loads(pickle.dumps(storage))
+        storage.set_tt_value(1, (1.0, None, None), 'exact', 3)
+        attached.set_tt_value(2, (2.0, None, None), 'lower', 2)
+        assert attached.get_tt_value(1, 3) == ('exact', (1.0, None, None))
+        assert storage.get_tt_value(2, 2) == ('lower', (2.0, None, None))
+        storage.new_generation()
+        assert attached.generation == 1
+        assert attached.stats()['hits'] == 1
+
+        # an entry with a key word from another write is rejected
+        index = storage._index(1)
+        storage.table[index + 1] ^= 1
+        assert storage.get_tt_value(1, 0) is None
+        attached.close()
+    finally:
+        storage.close()
+
+
+def test_move_history():
+    history = MoveHistory()
+    history.cutoff(10, 2, 3)
+    history.cutoff(20, 2, 2)
+    history.cutoff(20, 2, 2)
+    assert history.killers[2] == [20, 10]
+    assert history.score(20, 2) > history.score(10, 2) > history.score(30, 2)
+    assert history.score(20, 1) == 8
+    history.age()
+    assert history.killers[2] == [None, None]
+    assert history.score(20, 2) == 4
@@ -1,9 +1,10 @@
 import json
 import os
 import pickle
-import random
+import struct
 import time
 from collections import defaultdict
+from multiprocessing import resource_tracker, shared_memory
 from dataclasses import asdict, dataclass
 from pprint import pprint
 from traceback import format_exc
@@ -14,6 +15,8 @@ from abalone.enums import Direction, Player, Space
 from abalone.game import Game, IllegalMoveException
 from abalone.utils import line_from_to
 
+from .board import MOVE_CODES, MOVES
+
 DATA_DIR = './data'
 
 
@@ -107,55 +110,229 @@ class GameStats(Stats):
 
 
 class Storage:
-    def __init__(self):
-        self.zobrist = [[[0 for y in range(0, 9)]
-                         for x in range(0, 9)] for p in range(0, 2)]
-        self.table = {}
-        self.heuristic_cache = {}
-        self.children_cache = {}
-        self.initialize_keys()
-
-    def initialize_keys(self):
+    '''
+    Transposition table with a fixed memory budget. The table is preallocated as a flat array of 64 bit
+    words and divided into buckets of two slots: the first slot keeps the entry with the deepest
+    search, the second one is always replaced. Every entry is packed into a key word and a data word:
+
+    ```
+    data: | valid (1) | generation (8) | flag (2) | depth (8) | move code + 1 (12) | value as float32 (32) |
+    key:  | Zobrist key XOR data (64) |
+    ```
+
+    An entry only matches if its key word XOR its data word gives the key, so an entry whose two words
+    do not belong together, e.g. because another process wrote one of them in between, is a miss.
+
+    `new_generation` is called once per turn. Entries of older generations can still be found, but
+    they are replaced in the depth-preferred slot regardless of their depth, so the table ages instead
+    of filling up with stale deep searches.
+    '''
+    SLOTS = 2
+    WORDS = 2
+    FLAGS = [None, 'lower', 'upper', 'exact']
+
+    def __init__(self, max_memory: int = 32 * 2**20):
+        bucket_size = self.SLOTS * self.WORDS * 8
+        # power of two, so the bucket index is just the lower bits of the key
+        self.buckets = 2**max(0, (max_memory // bucket_size).bit_length() - 1)
+        self.mask = self.buckets - 1
+        self.table = self._allocate(self.buckets * bucket_size)
+        self.generation = 0
+        self._reset_stats()
+
+    def _allocate(self, size: int) -> memoryview:
+        return memoryview(bytearray(size)).cast('Q')
+
+    def _reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.overwrites = 0
+        self.stores = 0
+
+    @property
+    def memory(self) -> int:
+        return self.table.nbytes
+
+    def new_generation(self):
+        self.generation = (self.generation + 1) % 256
+
+    def clear(self):
+        self.table.cast('B')[:] = bytes(self.table.nbytes)
+        self.generation = 0
+
+    def stats(self) -> dict:
+        probes = self.hits + self.misses
+        return {
+            'hit_rate': self.hits / probes if probes else 0.0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'overwrites': self.overwrites,
+            'stores': self.stores,
+            'memory': self.memory,
+        }
+
+    @staticmethod
+    def _pack(value: float, code: int, depth: int, flag: int, generation: int) -> int:
+        value_bits = struct.unpack('<I', struct.pack('<f', value))[0]
+        return value_bits | (code + 1) << 32 | depth << 44 | flag << 52 | generation << 54 | 1 << 62
+
+    @staticmethod
+    def _unpack(data: int) -> Tuple[float, int, int, int, int]:
+        value = struct.unpack('<f', struct.pack('<I', data & 0xFFFFFFFF))[0]
+        return value, (data >> 32 & 0xFFF) - 1, data >> 44 & 0xFF, data >> 52 & 0x3, data >> 54 & 0xFF
+
+    def _index(self, key: int) -> int:
+        return (key & self.mask) * self.SLOTS * self.WORDS
+
+    def probe(self, key: int) -> Union[Tuple[str, Tuple[float, Union[Space, Tuple[Space, Space]], Direction], int], None]:
         '''
-        Generate Zobrist hash keys
-        '''
-        for p in range(0, 2):
-            for x in range(0, 9):
-                for y in range(0, 9):
-                    self.zobrist[p][x][y] = random.getrandbits(64) - 2**63
+        Looks up the entry of a position regardless of its depth
 
-    def get_key(self, marbles: dict):
-        '''
-        Get the state at the key
+        Returns:
+            The flag, the value together with the best move and the depth of the entry or `None`
         '''
-        key = 0
-        for player in marbles.keys():
-            p = 0 if player == Player.BLACK.value else 1
-            for x in marbles[player].keys():
-                for y in marbles[player][x].keys():
-                    key ^= self.zobrist[p][x][y]
-        return key
-
-    def get_tt_value(self, key: int,  marbles: dict, depth: int) -> Tuple[Tuple[Union[Space, Tuple[Space, Space]], Direction], str, float]:
-        if key in self.table and self.table[key]['depth'] >= depth:
-            tt_entry = self.table[key]
-            return tt_entry['flag'], tt_entry['value']
+        index = self._index(key)
+        for slot in range(index, index + self.SLOTS * self.WORDS, self.WORDS):
+            data = self.table[slot + 1]
+            if data and self.table[slot] ^ data == key:
+                value, code, depth, flag, _ = self._unpack(data)
+                self.hits += 1
+                move = MOVES[code] if code >= 0 else (None, None)
+                return self.FLAGS[flag], (value, move[0], move[1]), depth
+        if self.table[index + 1] or self.table[index + self.WORDS + 1]:
+            self.collisions += 1
+        self.misses += 1
         return None
 
-    def set_tt_value(self, key: int, value: dict):
-        self.table[key] = value
+    def get_tt_value(self, key: int, depth: int) -> Union[Tuple[str, Tuple[float, Union[Space, Tuple[Space, Space]], Direction]], None]:
+        entry = self.probe(key)
+        if entry is not None and entry[2] >= depth:
+            return entry[0], entry[1]
+        return None
+
+    def set_tt_value(self, key: int, value: Tuple[float, Union[Space, Tuple[Space, Space]], Direction], flag: str, depth: int):
+        code = MOVE_CODES[(value[1], value[2])] if value[1] is not None else -1
+        data = self._pack(value[0], code, depth,
+                          self.FLAGS.index(flag), self.generation)
+        index = self._index(key)
+        depth_preferred = index
+        always_replace = index + self.WORDS
+        self.stores += 1
+
+        if self.table[always_replace] ^ self.table[always_replace + 1] == key:
+            slot = always_replace
+        elif self.table[depth_preferred] ^ self.table[depth_preferred + 1] == key:
+            slot = depth_preferred
+        else:
+            current = self.table[depth_preferred + 1]
+            _, _, current_depth, _, current_generation = self._unpack(current)
+            if not current or current_generation != self.generation or depth >= current_depth:
+                # the previous deepest entry is moved into the always replace slot
+                if self.table[always_replace + 1]:
+                    self.overwrites += 1
+                self.table[always_replace] = self.table[depth_preferred]
+                self.table[always_replace + 1] = current
+                slot = depth_preferred
+            else:
+                if self.table[always_replace + 1]:
+                    self.overwrites += 1
+                slot = always_replace
+        self.table[slot] = key ^ data
+        self.table[slot + 1] = data
+
+
+class SharedStorage(Storage):
+    '''
+    `Storage` in `multiprocessing.shared_memory`, so that all worker processes read and write the same
+    table. Writes are not locked, the XOR of key and data word rejects entries that were torn by
+    concurrent writes. The generation is kept in the shared memory as well, while the counters of
+    `stats` belong to the process that probes.
+
+    The table is passed to the workers by pickling it, which only sends the name of the shared memory.
+    The process that created the table releases it with `close`.
+    '''
+
+    def _allocate(self, size: int) -> memoryview:
+        # one additional word for the generation
+        self.shared_memory = shared_memory.SharedMemory(
+            create=True, size=size + 8)
+        self._owner = True
+        return self._attach(size)
+
+    def _attach(self, size: int) -> memoryview:
+        self._header = self.shared_memory.buf[size:size + 8].cast('Q')
+        return self.shared_memory.buf[:size].cast('Q')
+
+    @property
+    def generation(self) -> int:
+        return self._header[0]
+
+    @generation.setter
+    def generation(self, generation: int):
+        self._header[0] = generation
+
+    def __getstate__(self) -> dict:
+        return {'name': self.shared_memory.name, 'buckets': self.buckets}
+
+    def __setstate__(self, state: dict):
+        self.shared_memory = shared_memory.SharedMemory(name=state['name'])
+        # the process that created the table is responsible for removing it
+        resource_tracker.unregister(
+            self.shared_memory._name, 'shared_memory')
+        self._owner = False
+        self.buckets = state['buckets']
+        self.mask = self.buckets - 1
+        self.table = self._attach(
+            self.buckets * self.SLOTS * self.WORDS * 8)
+        self._reset_stats()
+
+    def close(self):
+        self.table.release()
+        self._header.release()
+        self.shared_memory.close()
+        if self._owner:
+            self.shared_memory.unlink()
+
+
+class MoveHistory:
+    '''
+    Killer moves and history heuristic, which order moves without building the resulting positions.
+    Both are indexed by the move code of `board.MOVE_CODES`, i.e. by marble group and direction.
+
+    Every move that causes a beta cutoff becomes the first killer move of its ply, the previous
+    one moves to the second slot, and its history score rises by the square of the remaining depth.
+    `age` is called once per turn: the killers are cleared, since the plies refer to another root,
+    and the history scores are halved, so that old cutoffs count less than recent ones.
+    '''
+    KILLERS = 2
+    MAX_PLY = 128
+    # killers are searched before any move that only has a history score
+    KILLER_SCORES = [2**40, 2**39]
 
-    def get_cache_value(self, key: int):
-        return self.heuristic_cache.get(key, None)
+    def __init__(self):
+        self.killers = [[None] * self.KILLERS for _ in range(self.MAX_PLY)]
+        self.history = [0] * len(MOVES)
 
-    def set_cache_value(self, key: int, value: float):
-        self.heuristic_cache[key] = value
+    def cutoff(self, code: int, ply: int, depth: int):
+        killers = self.killers[ply]
+        if killers[0] != code:
+            killers[1:] = killers[:-1]
+            killers[0] = code
+        self.history[code] += depth * depth
 
-    def get_cached_children(self, key: int):
-        return self.children_cache.get(key, None)
+    def score(self, code: int, ply: int) -> int:
+        killers = self.killers[ply]
+        for i, killer in enumerate(killers):
+            if killer == code:
+                return self.KILLER_SCORES[i]
+        return self.history[code]
 
-    def set_cached_children(self, key: int, value: list):
-        self.children_cache[key] = value
+    def age(self):
+        for killers in self.killers:
+            killers[:] = [None] * self.KILLERS
+        self.history = [score // 2 for score in self.history]
 
 
 def run_game(black: AbstractPlayer, white: AbstractPlayer, is_verbose: bool = True) \
@@ -213,4 +390,9 @@ def run_game(black: AbstractPlayer, white: AbstractPlayer, is_verbose: bool = Tr
                 print(f'{game.turn.name}\'s move caused an exception\n')
                 print(format_exc())
             break
+
+    for player in (black, white):
+        close = getattr(player, 'close', None)
+        if close is not None:
+            close()
     return game, moves_history, move_stats
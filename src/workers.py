@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""This module contains the pool of worker processes that the parallel players search with"""
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import AsyncResult
+from typing import Callable, List
+
+
+class WorkerPool:
+    '''
+    Worker processes that live as long as the player owning them, so they are started once per game
+    instead of once per search. The processes are started with the first `map` and stopped by `close`,
+    which the player calls when the game is over.
+
+    `initializer` is called with `initargs` in every process when it starts. `stats` holds the latest
+    statistics that the tasks reported for each worker process, keyed by its process id.
+    '''
+
+    def __init__(self, processes: int = None, initializer: Callable = None, initargs: tuple = ()):
+        self.processes = processes or cpu_count()
+        self.initializer = initializer
+        self.initargs = initargs
+        self.stats = {}
+        self._pool = None
+
+    def _start(self) -> Pool:
+        if self._pool is None:
+            self._pool = Pool(self.processes, self.initializer, self.initargs)
+        return self._pool
+
+    def map(self, function: Callable, tasks: List[tuple]) -> list:
+        '''
+        Calls `function` with the arguments of every task in the worker processes
+
+        Returns:
+            The results in the order of `tasks`
+        '''
+        return self._start().starmap(function, tasks, chunksize=1)
+
+    def map_async(self, function: Callable, tasks: List[tuple]) -> AsyncResult:
+        '''
+        Same as `map`, but returns at once. The results are collected with `get` of the returned object.
+        '''
+        return self._start().starmap_async(function, tasks, chunksize=1)
+
+    def apply_async(self, function: Callable, args: tuple) -> AsyncResult:
+        '''
+        Calls `function` with `args` in one of the worker processes and returns at once, like `map_async`
+        for a single task whose result `get` returns
+        '''
+        return self._start().apply_async(function, args)
+
+    def batches(self, items: list, per_process: int = 2) -> List[list]:
+        '''
+        Splits `items` into a few batches per process. The items are dealt out in turn, so items that
+        are close in the order, like the best moves after ordering, end up in different batches.
+        '''
+        count = min(len(items), self.processes * per_process)
+        return [items[i::count] for i in range(count)]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None